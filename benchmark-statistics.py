@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Times collect_statistics() on a synthetic database, to compare versions of
+validation/statistics.py.
+
+Usage:
+    benchmark-statistics.py [options]
+
+Options:
+    --database=PATH      SQLite database to use, created and filled if it does
+                         not exist [default: benchmark-statistics.sqlite3]
+    --phrases=N          How many phrases to create [default: 200000]
+    --repeat=N           How many times to run collect_statistics() [default: 3]
+
+The database has two recordings per phrase, three history rows per phrase
+and two per recording, about half of them by a human. Creating it takes a few
+minutes; later runs reuse it. To compare with another version, run this
+script from a checkout of that version with the same --database.
+
+Example:
+    benchmark-statistics.py --phrases=200000
+"""
+
+import os
+import random
+import time
+from pathlib import Path
+
+from docopt import docopt
+
+
+def main():
+    args = docopt(__doc__)
+    database = Path(args["--database"]).resolve()
+    # Must be set before Django reads the settings.
+    os.environ["RECVAL_SQLITE_DB_PATH"] = os.fspath(database)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "recvalsite.settings")
+
+    import django
+
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from validation.models import LanguageVariant
+    from validation.statistics import collect_statistics
+
+    if not database.exists():
+        print(f"Creating {database}...")
+        build_database(int(args["--phrases"]))
+
+    language = LanguageVariant.objects.get(code="maskwacis")
+    for _ in range(int(args["--repeat"])):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            collect_statistics(language)
+            elapsed = time.perf_counter() - start
+        print(f"{len(context.captured_queries)} queries, {elapsed:.2f}s")
+
+
+def build_database(phrase_count):
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import transaction
+
+    from validation.models import (
+        LanguageVariant,
+        Phrase,
+        Recording,
+        Speaker,
+        get_default_collection,
+    )
+
+    call_command("migrate", verbosity=0)
+    rng = random.Random(1)
+    alphabet = "ptkcsmnywêioaîôâ"
+
+    def word():
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(3, 10)))
+
+    with transaction.atomic():
+        language = LanguageVariant.objects.create(name="Maskwacîs", code="maskwacis")
+        human = User.objects.create(username="human")
+        speaker = Speaker.objects.create(code="MAR", full_name="M", gender="F")
+        collection = get_default_collection()
+
+        phrases = Phrase.objects.bulk_create(
+            [
+                Phrase(
+                    transcription=" ".join(
+                        word() for _ in range(rng.choice([1, 1, 1, 2, 3]))
+                    ),
+                    translation="x",
+                    kind=Phrase.WORD,
+                    field_transcription="x",
+                    fuzzy_transcription="x",
+                    language=language,
+                    validated=rng.random() < 0.3,
+                    status=rng.choice(
+                        [Phrase.NEW, Phrase.LINKED, Phrase.REVIEW, Phrase.AUTO]
+                    ),
+                    origin=rng.choice([Phrase.NEW_WORD, Phrase.MASKWACÎS_DICTIONARY]),
+                    analysis=rng.choice(["", "x"]),
+                )
+                for _ in range(phrase_count)
+            ],
+            batch_size=5000,
+        )
+        recordings = Recording.objects.bulk_create(
+            [
+                Recording(
+                    id=f"{phrase.id}-{index}",
+                    compressed_audio="x.m4a",
+                    speaker=speaker,
+                    timestamp=0,
+                    phrase=phrase,
+                    quality=rng.choice(
+                        [Recording.GOOD, Recording.OK, Recording.BAD, Recording.UNKNOWN]
+                    ),
+                    is_best=rng.random() < 0.1,
+                    wrong_word=rng.random() < 0.05,
+                    collection_id=collection,
+                )
+                for phrase in phrases
+                for index in range(2)
+            ],
+            batch_size=5000,
+        )
+
+        for model, objs, rounds in ((Phrase, phrases, 3), (Recording, recordings, 2)):
+            for _ in range(rounds):
+                by_human = [obj for obj in objs if rng.random() < 0.5]
+                by_human_ids = {obj.pk for obj in by_human}
+                model.history.bulk_history_create(
+                    by_human, default_user=human, batch_size=5000
+                )
+                model.history.bulk_history_create(
+                    [obj for obj in objs if obj.pk not in by_human_ids],
+                    batch_size=5000,
+                )
+
+
+if __name__ == "__main__":
+    main()
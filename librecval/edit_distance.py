@@ -0,0 +1,149 @@
+"""
+A weighted edit distance for comparing spellings of Plains Cree words in SRO.
+
+Following the rules for minimum edit distance used for spelling suggestions:
+
+ - adding/removing diacritics or hyphens, swapping the glides w/y, or
+   adding/removing the aspiration -h- between a vowel and a consonant costs
+   nothing, except that ê may not lose its circumflex: e -> ê is free, but
+   ê -> e costs one;
+ - inserting/removing the vowel -i- between two consonants costs half;
+ - inserting/removing/substituting any other character costs one.
+"""
+
+from typing import Iterable
+
+VOWELS = frozenset("aeiouâêîô")
+CONSONANTS = frozenset("bcdfghjklmnpqrstvwxyz")
+
+# Substituting one of these characters for the other costs nothing: vowels
+# with and without diacritics, and the glides w and y. ê is not folded into e,
+# since only e -> ê is free (see _distance()).
+FOLD_FREE_SUBSTITUTIONS = str.maketrans("âîôāēīōy", "aioaêiow")
+
+
+def weighted_edit_distance(source: str, target: str, maximum=None) -> float:
+    """
+    Returns the weighted cost of editing source into target.
+
+    If the cost will exceed maximum, this may give up early and return any
+    cost greater than maximum.
+
+    Ordinary edits cost one each:
+
+    >>> weighted_edit_distance("nipiy", "nipiy")
+    0.0
+    >>> weighted_edit_distance("nipiy", "nipit")
+    1.0
+    >>> weighted_edit_distance("acimosis", "acimosisak")
+    2.0
+
+    Diacritics, hyphens, and glides are free:
+
+    >>> weighted_edit_distance("e-nipat", "ênipat")
+    0.0
+    >>> weighted_edit_distance("miywasin", "miwwasin")
+    0.0
+
+    Except removing the circumflex from ê:
+
+    >>> weighted_edit_distance("nipet", "nipêt")
+    0.0
+    >>> weighted_edit_distance("nipêt", "nipet")
+    1.0
+
+    So is the aspiration -h- between a vowel and a consonant:
+
+    >>> weighted_edit_distance("mikwaw", "mihkwaw")
+    0.0
+    >>> weighted_edit_distance("hmikwaw", "mikwaw")
+    1.0
+
+    Including after a long vowel:
+
+    >>> weighted_edit_distance("nipâtaw", "nipâhtaw")
+    0.0
+    >>> weighted_edit_distance("kîhkwahaskân", "kîkwahaskân")
+    0.0
+
+    And an -i- between two consonants is only half an edit:
+
+    >>> weighted_edit_distance("tanisi", "tansi")
+    0.5
+
+    >>> weighted_edit_distance("nipiy", "atim", maximum=1) > 1
+    True
+    """
+    return _distance(_prepare(source), _prepare(target), maximum)
+
+
+def weighted_edit_distances(source: str, targets: Iterable[str], maximum=None):
+    """
+    Returns the weighted cost of editing source into each of the targets, in
+    order. Faster than calling weighted_edit_distance() for each of them.
+
+    >>> weighted_edit_distances("tansi", ["tânisi", "tansi", "atim"])
+    [0.5, 0.0, 4.0]
+    """
+    prepared_source = _prepare(source)
+    return [_distance(prepared_source, _prepare(target), maximum) for target in targets]
+
+
+def _prepare(word: str):
+    """
+    Returns the word with the characters that substitute for each other for
+    free folded together, and the cost of inserting or deleting each character.
+    """
+    return word.translate(FOLD_FREE_SUBSTITUTIONS), [
+        _indel_cost(word, index) for index in range(len(word))
+    ]
+
+
+def _distance(source, target, maximum) -> float:
+    source_chars, deletions = source
+    target_chars, insertions = target
+
+    previous = [0.0]
+    for insertion in insertions:
+        previous.append(previous[-1] + insertion)
+
+    for source_char, deletion in zip(source_chars, deletions):
+        # The cost of the cell to the left, in the current row.
+        left = previous[0] + deletion
+        current = [left]
+        for j, target_char in enumerate(target_chars):
+            # "we should never replace ê with e though"
+            if source_char == target_char or (
+                source_char == "e" and target_char == "ê"
+            ):
+                cost = previous[j]
+            else:
+                cost = previous[j] + 1.0
+            if previous[j + 1] + deletion < cost:
+                cost = previous[j + 1] + deletion
+            if left + insertions[j] < cost:
+                cost = left + insertions[j]
+            current.append(cost)
+            left = cost
+        previous = current
+        if maximum is not None and min(previous) > maximum:
+            return min(previous)
+
+    return previous[-1]
+
+
+def _indel_cost(word: str, index: int) -> float:
+    """
+    The cost of inserting or deleting word[index], given its neighbours.
+    """
+    char = word[index]
+    before = word[index - 1] if index > 0 else ""
+    after = word[index + 1] if index + 1 < len(word) else ""
+
+    if char == "-":
+        return 0.0
+    if char == "h" and before in VOWELS and after in CONSONANTS:
+        return 0.0
+    if char == "i" and before in CONSONANTS and after in CONSONANTS:
+        return 0.5
+    return 1.0
@@ -122,6 +122,27 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Responses of the public recordings API are cached on disk, so that all worker
+# processes share (and invalidate) the same entries. See validation/api_cache.py
+RECVAL_CACHE_DIR = config("RECVAL_CACHE_DIR", default=BASE_DIR / "cache", cast=Path)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "recordings": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.fspath(RECVAL_CACHE_DIR / "recordings"),
+        # Changes that bypass signals (e.g., QuerySet.update()) show up within the hour.
+        "TIMEOUT": 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 10_000},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -269,7 +290,25 @@ MEDIA_ROOT = config("MEDIA_ROOT", default=BASE_DIR / "data", cast=str)
 LOGIN_REDIRECT_URL = "/"
 LOGIN_URL = "/login"
 
+# Load the speller and analyzer (for spelling suggestions on segment pages)
+# when the app starts, rather than when they are first needed.
+RECVAL_PRELOAD_LANGUAGE_TOOLS = config(
+    "RECVAL_PRELOAD_LANGUAGE_TOOLS", default=False, cast=bool
+)
+
+# Also keep the analyses of the FST analyzer in the database, so that every
+# process benefits from them (see validation/analysis_cache.py).
+RECVAL_PERSIST_FST_ANALYSES = config(
+    "RECVAL_PERSIST_FST_ANALYSES", default=False, cast=bool
+)
+
 ITWEWINA_URL = "https://itwewina.altlab.app/"
+# Optionally, the name of one of the CACHES in which to share itwêwina lookups
+# between processes (see validation/itwewina.py).
+ITWEWINA_CACHE = config("ITWEWINA_CACHE", default=None)
+# Optionally, the path of a dictionary snapshot in which to look words up
+# instead of itwêwina (see validation/itwewina.py).
+ITWEWINA_SNAPSHOT = config("ITWEWINA_SNAPSHOT", default=None)
 
 FIXTURE_DIRS = (BASE_DIR / "validation" / "management" / "fixtures",)
 
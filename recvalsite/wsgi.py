@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/2.1/howto/deployment/wsgi/
 """
 
+import gc
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "recvalsite.settings")
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402 (settings are ready now)
+
+if settings.RECVAL_PRELOAD_LANGUAGE_TOOLS:
+    from validation.helpers import preload_language_tools
+
+    preload_language_tools()
+    # uWSGI (without lazy-apps) imports this module in its master process and
+    # then forks the workers, which share the speller and analyzer loaded
+    # above copy-on-write. Freezing the objects loaded so far keeps the
+    # workers' garbage collectors from writing to (and so copying) them.
+    gc.freeze()
@@ -0,0 +1,236 @@
+"""
+Compiles the parameters of the advanced search form into a query.
+
+The text fields (transcription, translation, analysis, lemma) are
+alternatives: a phrase matches when ANY of them matches. Every other field
+(status, kind, semantic class, speaker, quality) narrows the results down.
+
+Speaker and quality are checked with an EXISTS subquery on the recordings,
+rather than a join, so that the phrases never need to be made distinct.
+"""
+
+import json
+from functools import reduce
+from hashlib import sha256
+from operator import and_, or_
+from typing import NamedTuple, Optional
+
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+
+from librecval.normalization import to_indexable_form
+
+from .models import Phrase, Recording, SemanticClassAnnotation
+from .search import order_by_relevance, text_matches
+
+STATUS_FILTERS = {
+    "new": Q(status=Phrase.NEW),
+    "linked": Q(status=Phrase.LINKED),
+    "auto-validated": Q(status=Phrase.AUTO),
+    "user-submitted": Q(status=Phrase.USER),
+    "needs-review": Q(status=Phrase.REVIEW),
+    "not-checked": Q(status__in=(Phrase.NEW, Phrase.AUTO, Phrase.USER)),
+    "grey-card": ~Q(validated=True) & ~Q(status=Phrase.REVIEW),
+}
+
+KIND_FILTERS = {
+    "word": Q(kind=Phrase.WORD),
+    "sentence": Q(kind=Phrase.SENTENCE),
+}
+
+# Facet counts are cached briefly: they only guide the search form, so they
+# may lag a little behind edits.
+FACET_COUNTS_TIMEOUT = 60  # seconds
+
+
+class SearchPlan(NamedTuple):
+    """
+    An advanced search, ready to run against the database.
+
+    Each facet's filter is kept under its own name, so that facet counts can
+    leave out the facet being counted.
+    """
+
+    # Phrases must match at least one of these...
+    text_filters: list
+    # ...and all of these (keyed by facet)...
+    phrase_filters: dict
+    # ...and have a semantic class annotation matching all of these...
+    annotation_filters: dict
+    # ...and have a recording matching all of these, which are also the only
+    # recordings shown.
+    recording_filters: dict
+    # Used to order the results by relevance.
+    text_terms: dict
+
+    @property
+    def recording_filter(self) -> Optional[Q]:
+        if not self.recording_filters:
+            return None
+        return reduce(and_, self.recording_filters.values())
+
+    def phrases(self, language):
+        """
+        Returns the phrases of the language that match this search, most
+        relevant first.
+        """
+        return order_by_relevance(self.matching(language), self.text_terms)
+
+    def matching(self, language, ignoring=()):
+        """
+        Returns the phrases of the language that match this search, in no
+        particular order, optionally ignoring some of the facets.
+        """
+        phrases = Phrase.objects.filter(language=language)
+        if self.text_filters:
+            phrases = phrases.filter(reduce(or_, self.text_filters))
+        for facet, phrase_filter in self.phrase_filters.items():
+            if facet not in ignoring:
+                phrases = phrases.filter(phrase_filter)
+        annotation_filters = self._without(self.annotation_filters, ignoring)
+        if annotation_filters:
+            phrases = phrases.filter(
+                Exists(
+                    SemanticClassAnnotation.objects.filter(
+                        *annotation_filters, phrase=OuterRef("pk")
+                    )
+                )
+            )
+        recording_filters = self._without(self.recording_filters, ignoring)
+        if recording_filters:
+            phrases = phrases.filter(
+                Exists(
+                    Recording.objects.filter(*recording_filters, phrase=OuterRef("pk"))
+                )
+            )
+        return phrases
+
+    @staticmethod
+    def _without(filters: dict, ignoring) -> list:
+        return [q for facet, q in filters.items() if facet not in ignoring]
+
+
+def compile_search(params) -> SearchPlan:
+    """
+    Compiles the GET parameters of the advanced search form (a QueryDict).
+    Unknown choices and "all" do not filter anything.
+    """
+    text_filters = []
+    text_terms = {}
+
+    transcription = (params.get("transcription") or "").strip()
+    if transcription:
+        if params.get("exact") == "exact":
+            text_filters.append(Q(transcription=transcription))
+        else:
+            text_terms["transcription"] = transcription
+            text_terms["fuzzy_transcription"] = to_indexable_form(transcription)
+    translation = (params.get("translation") or "").strip()
+    if translation:
+        text_terms["translation"] = translation
+    if text_terms:
+        text_filters.append(text_matches(text_terms))
+    for analysis in (params.get("analysis"), params.get("lemma")):
+        if analysis and analysis.strip():
+            text_filters.append(text_matches({"analysis": analysis.strip()}))
+
+    phrase_filters = {}
+    status = params.get("status")
+    if status in STATUS_FILTERS:
+        phrase_filters["status"] = STATUS_FILTERS[status]
+    kind = params.get("kind")
+    if kind in KIND_FILTERS:
+        phrase_filters["kind"] = KIND_FILTERS[kind]
+
+    annotation_filters = {}
+    semantic_class = params.get("semantic_class")
+    if semantic_class:
+        annotation_filters["semantic_class"] = Q(
+            semantic_class__classification=semantic_class
+        )
+    source = params.get("semantic-class-source")
+    if source and source != "all":
+        annotation_filters["semantic_class_source"] = Q(source=source)
+
+    recording_filters = {}
+    speakers = params.getlist("speaker-options")
+    if speakers and "all" not in speakers:
+        recording_filters["speaker"] = Q(speaker__in=speakers)
+    quality = params.getlist("quality")
+    if quality and "all" not in quality:
+        recording_filters["quality"] = Q(quality__in=quality)
+
+    return SearchPlan(
+        text_filters=text_filters,
+        phrase_filters=phrase_filters,
+        annotation_filters=annotation_filters,
+        recording_filters=recording_filters,
+        text_terms=text_terms,
+    )
+
+
+def count_facets(plan: SearchPlan, language) -> dict:
+    """
+    Counts how many phrases each choice of the status, kind, speaker, quality,
+    and semantic class facets would find, given the rest of the search.
+
+    Each facet is counted with one (grouped) query, ignoring that facet's own
+    choice, so that the counts tell how changing the choice would change the
+    results.
+    """
+
+    def phrases_ignoring(facet):
+        return plan.matching(language, ignoring=(facet,)).order_by()
+
+    def count_phrases_by(related, facet, value, only):
+        counts = (
+            related.objects.filter(
+                *only, phrase__in=phrases_ignoring(facet).values("pk")
+            )
+            .values(value)
+            .annotate(count=Count("phrase", distinct=True))
+            .order_by()
+        )
+        return {row[value]: row["count"] for row in counts}
+
+    def other_recording_filters(facet):
+        return SearchPlan._without(plan.recording_filters, (facet,))
+
+    return {
+        "status": phrases_ignoring("status").aggregate(
+            **{key: Count("pk", filter=q) for key, q in STATUS_FILTERS.items()}
+        ),
+        "kind": phrases_ignoring("kind").aggregate(
+            **{key: Count("pk", filter=q) for key, q in KIND_FILTERS.items()}
+        ),
+        "speaker": count_phrases_by(
+            Recording, "speaker", "speaker", other_recording_filters("speaker")
+        ),
+        "quality": count_phrases_by(
+            Recording, "quality", "quality", other_recording_filters("quality")
+        ),
+        "semantic_class": count_phrases_by(
+            SemanticClassAnnotation,
+            "semantic_class",
+            "semantic_class__classification",
+            SearchPlan._without(plan.annotation_filters, ("semantic_class",)),
+        ),
+    }
+
+
+def cached_facet_counts(params, language) -> dict:
+    """
+    Returns count_facets() for the given GET parameters of the advanced search
+    form, from the cache if the same search was counted recently.
+    """
+    search = sorted(
+        (name, sorted(params.getlist(name))) for name in params if name != "page"
+    )
+    digest = sha256(json.dumps(search).encode("UTF-8")).hexdigest()
+    key = f"advanced-search-facets:{language.code}:{digest}"
+
+    counts = cache.get(key)
+    if counts is None:
+        counts = count_facets(compile_search(params), language)
+        cache.set(key, counts, FACET_COUNTS_TIMEOUT)
+    return counts
@@ -0,0 +1,119 @@
+"""
+Caches the analyses of wordforms by the FST analyzer, which spelling
+suggestions and autoval ask for over and over again for the same popular
+lemmas.
+
+Analyses are cached in memory (least recently used first out) and, if
+settings.RECVAL_PERSIST_FST_ANALYSES is set, in the FSTAnalysis table too, so
+that every process (and every run of autoval) benefits from each other's
+lookups. Persisted analyses are keyed by the SHA-256 of the analyzer's file,
+so replacing the FST makes them obsolete.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+from .models import FSTAnalysis
+
+MAX_CACHED_ANALYSES = 50_000
+
+
+class AnalysisCache:
+    """
+    Analyzes wordforms with lookup(wordform), remembering the results.
+    Thread-safe.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[[str], str],
+        fst_hash: str,
+        *,
+        max_size=MAX_CACHED_ANALYSES,
+        persistent=False,
+    ):
+        self.lookup = lookup
+        self.fst_hash = fst_hash
+        self.max_size = max_size
+        self.persistent = persistent
+
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "persistent_hits": 0, "misses": 0}
+
+    def analyze(self, wordform: str) -> str:
+        """
+        Returns the analysis of the wordform, or "" if it has none.
+        """
+        return self.analyze_many([wordform])[wordform]
+
+    def analyze_many(self, wordforms: Iterable[str]) -> dict:
+        """
+        Analyzes all the wordforms at once. Returns {wordform: analyze(wordform)}.
+        """
+        analyses = {}
+        with self._lock:
+            for wordform in wordforms:
+                if wordform in self._cache:
+                    self._cache.move_to_end(wordform)
+                    analyses[wordform] = self._cache[wordform]
+                    self._counts["hits"] += 1
+                elif wordform not in analyses:
+                    analyses[wordform] = None
+        missing = [
+            wordform for wordform, analysis in analyses.items() if analysis is None
+        ]
+        if not missing:
+            return analyses
+
+        found = self._persisted(missing) if self.persistent else {}
+        computed = {
+            wordform: self.lookup(wordform)
+            for wordform in missing
+            if wordform not in found
+        }
+        if self.persistent and computed:
+            self._persist(computed)
+
+        analyses.update(found)
+        analyses.update(computed)
+        with self._lock:
+            self._counts["persistent_hits"] += len(found)
+            self._counts["misses"] += len(computed)
+            for wordform in missing:
+                self._cache[wordform] = analyses[wordform]
+                self._cache.move_to_end(wordform)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return analyses
+
+    def statistics(self) -> dict:
+        """
+        Returns how many analyses were found in memory, in the FSTAnalysis
+        table, and by the FST, and the proportion that were not computed.
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        counts["hit_rate"] = (total - counts["misses"]) / total if total else 0.0
+        return counts
+
+    def _persisted(self, wordforms) -> dict:
+        return dict(
+            FSTAnalysis.objects.filter(
+                fst_hash=self.fst_hash, wordform__in=wordforms
+            ).values_list("wordform", "analysis")
+        )
+
+    def _persist(self, analyses: dict) -> None:
+        FSTAnalysis.objects.bulk_create(
+            [
+                FSTAnalysis(
+                    fst_hash=self.fst_hash, wordform=wordform, analysis=analysis
+                )
+                for wordform, analysis in analyses.items()
+            ],
+            # Another process may have analyzed them in the meantime.
+            ignore_conflicts=True,
+        )
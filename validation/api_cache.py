@@ -0,0 +1,120 @@
+"""
+Caches the responses of the public recordings API (search_recordings and
+bulk_search_recordings), which dictionaries (itwêwina, morphodict) query for
+the same popular word forms over and over again.
+
+Responses are cached per language. Saving or deleting a phrase or recording
+invalidates the cached responses of its language; saving or deleting a
+speaker invalidates every cached response (see the receivers in models.py).
+Invalidation works by replacing a generation number that is part of every
+cache key, so nothing has to be deleted. It must only happen once the change
+is committed (with transaction.on_commit()): otherwise, a concurrent request
+could cache the uncommitted data under the new generation.
+
+Each process counts its own hits and misses; see cache_statistics().
+"""
+
+import json
+import threading
+import time
+from hashlib import sha256
+
+from django.core.cache import caches
+from django.http import HttpResponse
+
+CACHE_ALIAS = "recordings"
+
+# Responses of search_recordings are not specific to one language.
+ALL_LANGUAGES = "all"
+
+EPOCH_KEY = "epoch"
+
+# Counted in memory: counting in the shared cache would mean one more
+# (non-atomic) write to it per request.
+_counts = {"hits": 0, "misses": 0}
+_counts_lock = threading.Lock()
+
+
+def cached_json_response(request, *, language, key, make_response) -> HttpResponse:
+    """
+    Returns a copy of the cached response for the key, or else calls
+    make_response() and caches its result.
+
+    language is a LanguageVariant id (or ALL_LANGUAGES), and key is anything
+    JSON-serializable that, with the language, determines the response.
+    """
+    cache = caches[CACHE_ALIAS]
+    generation_keys = [EPOCH_KEY, _generation_key(language)]
+    generations = cache.get_many(generation_keys)
+    for generation_key in generation_keys:
+        if generation_key not in generations:
+            generations[generation_key] = _new_generation(cache, generation_key)
+    parts = [
+        generations[EPOCH_KEY],
+        generations[_generation_key(language)],
+        # The responses contain absolute URLs:
+        request.scheme,
+        request.get_host(),
+        language,
+        key,
+    ]
+    cache_key = "response:" + sha256(json.dumps(parts).encode("UTF-8")).hexdigest()
+
+    cached = cache.get(cache_key)
+    if cached is not None:
+        _count("hits")
+        content, status = cached
+        response = HttpResponse(content, status=status, content_type="application/json")
+        response["X-Cache"] = "HIT"
+        return response
+
+    _count("misses")
+    response = make_response()
+    cache.set(cache_key, (response.content, response.status_code))
+    response["X-Cache"] = "MISS"
+    return response
+
+
+def invalidate_language(language_id) -> None:
+    """
+    Forgets the cached responses that may contain recordings of the language.
+    """
+    cache = caches[CACHE_ALIAS]
+    _new_generation(cache, _generation_key(language_id))
+    _new_generation(cache, _generation_key(ALL_LANGUAGES))
+
+
+def invalidate_all() -> None:
+    _new_generation(caches[CACHE_ALIAS], EPOCH_KEY)
+
+
+def cache_statistics() -> dict:
+    """
+    Returns how many requests this process served from the cache, and how many
+    it did not.
+    """
+    with _counts_lock:
+        return dict(_counts)
+
+
+def reset_cache_statistics() -> None:
+    with _counts_lock:
+        for key in _counts:
+            _counts[key] = 0
+
+
+def _generation_key(language) -> str:
+    return f"generation:{language}"
+
+
+def _new_generation(cache, key) -> int:
+    # Generations are never reused, not even if the cache evicts them: that
+    # would bring back responses cached during an older generation.
+    generation = time.time_ns()
+    cache.set(key, generation, timeout=None)
+    return generation
+
+
+def _count(key) -> None:
+    with _counts_lock:
+        _counts[key] += 1
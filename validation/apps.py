@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ValidationConfig(AppConfig):
     name = "validation"
+
+    def ready(self):
+        from .search import repair_search_index
+
+        post_migrate.connect(repair_search_index, sender=self)
@@ -0,0 +1,70 @@
+"""
+Fixtures shared by the tests of the validation app.
+"""
+
+import pytest  # type: ignore
+from django.core.cache import caches
+from model_bakery import baker  # type: ignore
+
+from validation.api_cache import CACHE_ALIAS, reset_cache_statistics
+from validation.models import Issue, Phrase
+
+
+@pytest.fixture(autouse=True)
+def recordings_api_cache(settings):
+    """
+    Keeps the recordings API cache in memory, and empties it (and resets its
+    statistics) before each test.
+    """
+    settings.CACHES = {
+        **settings.CACHES,
+        CACHE_ALIAS: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    caches[CACHE_ALIAS].clear()
+    reset_cache_statistics()
+    return caches[CACHE_ALIAS]
+
+
+@pytest.fixture
+def language():
+    return baker.make_recipe("validation.language")
+
+
+@pytest.fixture
+def make_phrases():
+    """
+    Returns a function that makes quantity identical phrases ("atim", "dog") in
+    the language, each with recordings_per_phrase recordings, made with the
+    given keyword arguments, and each of those with issues_per_recording open
+    issues. The function returns the phrases.
+    """
+
+    def make_phrases(
+        language, quantity, recordings_per_phrase, issues_per_recording=0, **kwargs
+    ):
+        phrases = baker.make_recipe(
+            "validation.phrase",
+            language=language,
+            transcription="atim",
+            translation="dog",
+            status=Phrase.NEW,
+            _quantity=quantity,
+        )
+        for phrase in phrases:
+            recordings = baker.make_recipe(
+                "validation.recording",
+                phrase=phrase,
+                compressed_audio="audio/mock_recording.m4a",
+                _quantity=recordings_per_phrase,
+                **kwargs,
+            )
+            for recording in recordings if issues_per_recording else []:
+                baker.make(
+                    Issue,
+                    recording=recording,
+                    status=Issue.OPEN,
+                    _quantity=issues_per_recording,
+                )
+        return phrases
+
+    return make_phrases
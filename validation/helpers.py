@@ -1,48 +1,135 @@
+from hashlib import sha256
 from os import fspath
 
-import divvunspell
-from difflib import Differ
-import hfst_optimized_lookup
-from urllib.parse import urljoin
+import threading
 import operator
 
-import requests
-import json
-
 from django.conf import settings
-from django.utils.http import urlencode
+from django.utils import timezone
+
+from librecval.edit_distance import weighted_edit_distances
+
+from . import itwewina
+from .analysis_cache import AnalysisCache
+from .models import PrecomputedSuggestions
 
 """
 RULES FOR MED
 
     adding/removing diacritics or hyphens, swapping glides w/y, or 
     adding/removing aspirations -h- between vowel and consonant would have a weight of zero.
+    except that we should never replace ê with e: only e -> ê has a weight of zero.
     inserting the vowel -i- between two consonants would have a half-weight (0.5).
     inserting/removing/swapping any other characters would have a normal weight of one.
 
 """
 
 
-archive = divvunspell.SpellerArchive(fspath(settings.BASE_DIR / "crk.zhfst"))
-speller = archive.speller()
+# The speller and the analyzer are big, and most processes (management
+# commands, tests, workers that never show a segment page) never need them,
+# so they are only loaded on first use (or by preload_language_tools()).
+_archive = None
+_speller = None
+_analyzer = None
+_analysis_cache = None
+_loading = threading.Lock()
 
-fst = hfst_optimized_lookup.TransducerFile(
-    fspath(settings.BASE_DIR / "crk-descriptive-analyzer.hfstol")
-)
 
-vowels = ["a", "i", "o", "â", "î", "ô", "e", "ê"]
-consonants = [f"  {char}" for char in "chkmnpstwy"]
+def get_speller():
+    """
+    Returns the Plains Cree speller, loading it if need be.
+    """
+    global _archive, _speller
+    if _speller is None:
+        with _loading:
+            if _speller is None:
+                import divvunspell
+
+                # Keep the archive alive for as long as its speller.
+                _archive = divvunspell.SpellerArchive(
+                    fspath(settings.BASE_DIR / "crk.zhfst")
+                )
+                _speller = _archive.speller()
+    return _speller
 
 
-def get_edit_distance(word):
+def get_analyzer():
+    """
+    Returns the Plains Cree morphological analyzer, loading it if need be.
+    """
+    global _analyzer
+    if _analyzer is None:
+        with _loading:
+            if _analyzer is None:
+                import hfst_optimized_lookup
+
+                _analyzer = hfst_optimized_lookup.TransducerFile(
+                    fspath(settings.BASE_DIR / "crk-descriptive-analyzer.hfstol")
+                )
+    return _analyzer
+
+
+def get_analysis_cache():
+    """
+    Returns this process's cache of the analyzer's analyses.
+    """
+    global _analysis_cache
+    if _analysis_cache is None:
+        analyzer = get_analyzer()
+        with _loading:
+            if _analysis_cache is None:
+                _analysis_cache = AnalysisCache(
+                    lambda wordform: first_or_blank(analyzer.lookup(wordform)),
+                    file_hash(settings.BASE_DIR / "crk-descriptive-analyzer.hfstol"),
+                    persistent=settings.RECVAL_PERSIST_FST_ANALYSES,
+                )
+    return _analysis_cache
 
-    ranked_suggestions = speller.suggest(word)
+
+def analysis_statistics():
+    """
+    Returns the statistics of this process's analysis cache, or None if
+    nothing was analyzed.
+    """
+    return _analysis_cache.statistics() if _analysis_cache is not None else None
+
+
+def first_or_blank(analyses):
+    return analyses[0] if len(analyses) > 0 else ""
+
+
+def file_hash(path):
+    digest = sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def preload_language_tools():
+    """
+    Loads the speller and the analyzer now, rather than on first use (e.g.,
+    so that the first segment page a worker serves is not slow).
+    """
+    get_speller()
+    get_analyzer()
+
+
+def get_edit_distance(word):
+    """
+    Returns the speller's suggestions for the word, ranked by rank_suggestions().
+    """
+    ranked_suggestions = get_speller().suggest(word)
     suggestions = [s[0] for s in ranked_suggestions if len(s) > 0]
+    return rank_suggestions(word, suggestions)
 
-    rankings = {}
-    for s in suggestions:
-        med = get_differ(word, s)
-        rankings[s] = med
+
+def rank_suggestions(word, suggestions):
+    """
+    Returns the suggestions, from the closest to the furthest, mapped to their
+    minimum edit distance from the word (see RULES FOR MED).
+    """
+    rankings = dict(zip(suggestions, weighted_edit_distances(word, suggestions)))
 
     sorted_tuples = sorted(rankings.items(), key=operator.itemgetter(1))
     sorted_rankings = {k: v for k, v in sorted_tuples}
@@ -50,142 +137,25 @@ def get_edit_distance(word):
     return sorted_rankings
 
 
-def has_vowel(c):
+def get_translations_from_itwewina(word):
     """
-    Returns True if the split string contains a vowel
-    and the vowel was either added or removed from the original word
-    to create the suggestion (hence the "split")
+    Returns itwêwina's click-in-text results for the word, or None on failure.
     """
-    return len(c.split()) > 1 and c.split()[1] in vowels
-
-
-def get_differ(word, suggestion):
-    med = 0
-    df = list(Differ().compare(word, suggestion))
-
-    def diff_char_or_none(index):
-        if index >= 0 and index < len(df):
-            return df[index]
-        return None
-
-    for i in range(len(df)):
-        c = df[i]
-
-        # check for replaced e with ê
-        # we should never replace ê with e though
-        if c == "- e" and diff_char_or_none(i + 1) == "+ ê":
-            continue
-
-        if c == "+ ê" and diff_char_or_none(i - 1) == "- e":
-            continue
-
-        # no change, carry on
-        if "+" not in c and "-" not in c:
-            continue
-
-        # added or removed a hyphen
-        if c == "- -" or c == "+ -":
-            continue
-
-        # check for swapping glides
-        if c == "- y" and diff_char_or_none(i + 1) == "+ w":
-            continue
-
-        if c == "- w" and diff_char_or_none(i + 1) == "+ y":
-            continue
-
-        if c == "+ y" and diff_char_or_none(i - 1) == "- w":
-            continue
-
-        if c == "+ w" and diff_char_or_none(i - 1) == "- y":
-            continue
-
-        # end check for swapping glides
-
-        if has_vowel(c):
-            # adding or removing a diacritic from a vowel has cost 0
-            alt = get_analog(c)
-            if i + 1 < len(df):
-                if df[i + 1] == alt:
-                    continue
-            if i - 1 >= 0:
-                if df[i - 1] == alt:
-                    continue
-
-        if "i" in c:
-            # adding an -i- between two consonants has cost 0.5
-            j = i + 1 if i + 1 < len(df) else None
-            k = i - 1 if i - 1 >= 0 else None
-            if j and k:
-                if df[j] in consonants and df[k] in consonants:
-                    med += 0.5
-                    continue
-
-        if "h" in c:
-            # did we just add an -h- between a vowel and a consonant?
-            j = i + 1 if i + 1 < len(df) else None
-            k = i - 1 if i - 1 >= 0 else None
-            if j and k:
-                after = df[j].replace("-", "")
-                after = after.replace("+", "")
-                before = df[k].replace("-", "")
-                before = before.replace("+", "")
-                after = "  " + after.strip()
-                before = before.strip()
-
-                if after in consonants and before in vowels:
-                    # we did, this costs nothing
-                    continue
-
-        # everything else has cost 1
-        med += 1
-
-    return med
-
-
-def get_analog(char):
-    # take in '- vowel'
-    # return '+ vowel with hat'
-    # OR
-    # take in '+ vowel'
-    # return '- vowel with hat'
-
-    alt = ""
-    if "-" in char:
-        alt = char.replace("-", "+")
-    else:
-        alt = char.replace("+", "-")
-
-    if char.split()[1] in ["a", "i", "o"]:
-        alt = alt.replace("a", "â")
-        alt = alt.replace("i", "î")
-        alt = alt.replace("o", "ô")
-
-    elif char.split()[1] in ["â", "î", "ô"]:
-        alt = alt.replace("â", "a")
-        alt = alt.replace("î", "i")
-        alt = alt.replace("ô", "o")
-
-    return alt
-
-
-def get_translations_from_itwewina(word):
-    url = (
-        urljoin(settings.ITWEWINA_URL, "click-in-text/") + "?" + urlencode({"q": word})
-    )
-    r = requests.get(url)
-    if r.status_code == 200:
-        return json.loads(r.text)
-    else:
-        return "Error getting request"
+    return itwewina.client().lookup(word)
 
 
 def get_translations(results):
     matches = []
+    if not results:
+        # itwêwina could not be reached.
+        return matches
 
+    analyses = get_analysis_cache().analyze_many(
+        i["wordform_text"] for i in results["results"]
+    )
     for i in results["results"]:
         translations, sources = extract_translations(i["lemma_wordform"])
-        analysis = get_analysis_from_fst(i["wordform_text"])
+        analysis = analyses[i["wordform_text"]]
         for source, translation in zip(sources, translations):
             if {
                 "translation": translation,
@@ -211,19 +181,24 @@ def extract_translations(entry):
 
 
 def get_analysis_from_fst(entry):
-    res = fst.lookup(entry)
-    if len(res) > 0:
-        return res[0]
-    else:
-        return ""
+    return get_analysis_cache().analyze(entry)
 
 
 def get_distance_with_translations(word):
+    suggestions, _complete = suggestions_with_translations(word)
+    return suggestions
+
+
+def suggestions_with_translations(word):
+    """
+    Returns the spelling suggestions for the word, with their MED and their
+    translations in itwêwina, and whether itwêwina could be reached for all of
+    them.
+    """
     suggestions = get_edit_distance(word)
+    lookups = itwewina.client().lookup_many(suggestions)
     for word in suggestions:
-        results = get_translations_from_itwewina(word)
-
-        matches = get_translations(results)
+        matches = get_translations(lookups[word])
 
         suggestions[word] = {
             "transcription": word,
@@ -232,9 +207,51 @@ def get_distance_with_translations(word):
             "len": len(matches) if len(matches) == 1 else len(matches) + 1,
         }
 
+    complete = all(results is not None for results in lookups.values())
+    return suggestions, complete
+
+
+def get_precomputed_suggestions(word):
+    """
+    Returns get_distance_with_translations(word), from the
+    PrecomputedSuggestions table if possible. Otherwise (including when they
+    are only queued), computes them, and stores them for next time (unless
+    itwêwina could not be reached).
+    """
+    stored = (
+        PrecomputedSuggestions.objects.filter(
+            transcription=word, computed_on__isnull=False
+        )
+        .values_list("suggestions", flat=True)
+        .first()
+    )
+    if stored is not None:
+        return stored
+
+    suggestions, complete = suggestions_with_translations(word)
+    if complete:
+        store_suggestions({word: suggestions})
     return suggestions
 
 
+def store_suggestions(suggestions_by_word):
+    """
+    Saves (or replaces) the suggestions of each word, in bulk.
+    """
+    now = timezone.now()
+    PrecomputedSuggestions.objects.bulk_create(
+        [
+            PrecomputedSuggestions(
+                transcription=word, suggestions=suggestions, computed_on=now
+            )
+            for word, suggestions in suggestions_by_word.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["transcription"],
+        update_fields=["suggestions", "computed_on"],
+    )
+
+
 def normalize_img_name(img_name):
     if not img_name:
         return ""
@@ -0,0 +1,85 @@
+"""
+Bulk writes that keep the simple_history records of the affected objects,
+complementing simple_history.utils.bulk_create_with_history and
+bulk_update_with_history.
+"""
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from simple_history.utils import get_change_reason_from_object
+
+# How many objects to delete per query, to stay under SQLite's limit on the
+# number of parameters of a query.
+DELETE_BATCH_SIZE = 500
+
+
+def bulk_delete_with_history(
+    objs,
+    model,
+    *,
+    default_user=None,
+    default_change_reason="",
+    default_date=None,
+):
+    """
+    Deletes the objects with one query (per DELETE_BATCH_SIZE objects), and
+    records their deletion in their history with one more (rather than one per
+    object, like delete() does).
+    The history records are filled in like bulk_history_create() does.
+
+    Deletions do not cascade, and no signals are sent, so this is only for
+    models that nothing references, like SemanticClassAnnotation.
+    """
+    objs = list(objs)
+    if not objs:
+        return
+
+    using = router.db_for_write(model)
+    with transaction.atomic(using=using):
+        if getattr(settings, "SIMPLE_HISTORY_ENABLED", True):
+            _create_deletion_history(
+                objs, model, default_user, default_change_reason, default_date
+            )
+
+        # Not QuerySet.delete(): simple_history's post_delete receiver would
+        # make it fetch and delete (and record) the objects one by one.
+        connection = connections[using]
+        table = connection.ops.quote_name(model._meta.db_table)
+        pk_column = connection.ops.quote_name(model._meta.pk.column)
+        pks = [obj.pk for obj in objs]
+        with connection.cursor() as cursor:
+            for start in range(0, len(pks), DELETE_BATCH_SIZE):
+                batch = pks[start : start + DELETE_BATCH_SIZE]
+                placeholders = ", ".join(["%s"] * len(batch))
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE {pk_column} IN ({placeholders})",
+                    batch,
+                )
+
+
+def _create_deletion_history(
+    objs, model, default_user, default_change_reason, default_date
+):
+    history_model = model.history.model
+    rows = []
+    for obj in objs:
+        row = history_model(
+            history_date=getattr(obj, "_history_date", default_date or timezone.now()),
+            history_user=getattr(
+                obj,
+                "_history_user",
+                default_user or history_model.get_default_history_user(obj),
+            ),
+            history_change_reason=get_change_reason_from_object(obj)
+            or default_change_reason,
+            history_type="-",
+            **{
+                field.attname: getattr(obj, field.attname)
+                for field in history_model.tracked_fields
+            },
+        )
+        if hasattr(history_model, "history_relation"):
+            row.history_relation_id = obj.pk
+        rows.append(row)
+    history_model.objects.bulk_create(rows)
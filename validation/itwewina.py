@@ -0,0 +1,300 @@
+"""
+Looks words up in itwêwina's click-in-text API, to find the translations of
+spelling suggestions.
+
+Lookups share one pooled HTTP session per process, time out quickly, and run
+concurrently when there are several words to look up. Results are cached in
+memory (least recently used first out, for CACHE_TTL seconds) and, if
+ITWEWINA_CACHE names one of the CACHES, in that cache too, so that every
+worker process benefits from each other's lookups.
+
+Failed lookups are not cached: they return None, which callers treat as "no
+translations", and will be retried next time.
+
+Where itwêwina cannot be reached (e.g., when importing offline), set
+ITWEWINA_SNAPSHOT to the path of a dictionary snapshot, made from
+itwêwina's importjson with:
+
+    python manage.py makedictionarysnapshot path/to/importjson
+
+client() then looks words up in the snapshot instead, with the same results.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from typing import Iterable, Optional, Union
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import caches
+
+# Seconds to wait for a connection, then for a response.
+TIMEOUT = (3.05, 5)
+
+# How many lookups may be in flight at once, per process.
+MAX_CONCURRENT_LOOKUPS = 8
+
+# How long, and how many, results are kept in memory.
+CACHE_TTL = 60 * 60 * 24
+MAX_CACHED_WORDS = 4096
+
+# Marks a word that is not in the cache.
+_MISSING = object()
+
+
+class ItwewinaClient:
+    """
+    Looks words up in itwêwina. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout=TIMEOUT,
+        cache_ttl=CACHE_TTL,
+        max_cached_words=MAX_CACHED_WORDS,
+        shared_cache=None,
+        clock=time.monotonic,
+    ):
+        self.url = urljoin(base_url, "click-in-text/")
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.max_cached_words = max_cached_words
+        self.shared_cache = shared_cache
+        self.clock = clock
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=MAX_CONCURRENT_LOOKUPS)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, word: str) -> Optional[dict]:
+        """
+        Returns itwêwina's click-in-text results for the word, or None if
+        itwêwina could not be reached.
+        """
+        results = self._cached(word)
+        if results is _MISSING:
+            results = self._fetch(word)
+        return results
+
+    def lookup_many(self, words: Iterable[str]) -> dict:
+        """
+        Looks all the words up at once. Returns {word: lookup(word)}.
+        """
+        results = {word: self._cached(word) for word in words}
+        missing = [word for word, result in results.items() if result is _MISSING]
+        if len(missing) == 1:
+            results[missing[0]] = self._fetch(missing[0])
+        elif missing:
+            workers = min(len(missing), MAX_CONCURRENT_LOOKUPS)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results.update(zip(missing, pool.map(self._fetch, missing)))
+        return results
+
+    def _fetch(self, word: str) -> Optional[dict]:
+        try:
+            response = self._session.get(
+                self.url, params={"q": word}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            results = response.json()
+        except (requests.RequestException, ValueError):
+            return None
+
+        self._remember(word, results)
+        if self.shared_cache is not None:
+            self.shared_cache.set(_shared_key(word), results, self.cache_ttl)
+        return results
+
+    def _cached(self, word: str):
+        with self._lock:
+            entry = self._cache.get(word)
+            if entry is not None:
+                expires, results = entry
+                if expires > self.clock():
+                    self._cache.move_to_end(word)
+                    return results
+                del self._cache[word]
+
+        if self.shared_cache is not None:
+            results = self.shared_cache.get(_shared_key(word), _MISSING)
+            if results is not _MISSING:
+                self._remember(word, results)
+            return results
+        return _MISSING
+
+    def _remember(self, word: str, results) -> None:
+        with self._lock:
+            self._cache[word] = (self.clock() + self.cache_ttl, results)
+            self._cache.move_to_end(word)
+            while len(self._cache) > self.max_cached_words:
+                self._cache.popitem(last=False)
+
+
+def _shared_key(word: str) -> str:
+    return "itwewina:" + sha256(word.encode("UTF-8")).hexdigest()
+
+
+class SnapshotClient:
+    """
+    Looks words up in a dictionary snapshot (see build_snapshot()), answering
+    like itwêwina's click-in-text API. Thread-safe.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"No dictionary snapshot at {self.path}")
+        self._local = threading.local()
+
+    def lookup(self, word: str) -> dict:
+        """
+        Returns the click-in-text results for the word: one per lemma that
+        the word is a form of.
+        """
+        rows = self._connection().execute(
+            """
+            SELECT wordform.wordform, lemma.head, lemma.definitions
+              FROM wordform JOIN lemma ON lemma.slug = wordform.lemma_slug
+             WHERE wordform.wordform = ?
+             ORDER BY lemma.slug
+            """,
+            (word,),
+        )
+        return {
+            "results": [
+                {
+                    "wordform_text": wordform,
+                    "lemma_wordform": {
+                        "text": head,
+                        "definitions": json.loads(definitions),
+                    },
+                }
+                for wordform, head, definitions in rows
+            ]
+        }
+
+    def lookup_many(self, words: Iterable[str]) -> dict:
+        """
+        Returns {word: lookup(word)}.
+        """
+        return {word: self.lookup(word) for word in words}
+
+    def _connection(self):
+        # SQLite connections cannot be shared between threads.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._local.connection = connection
+        return connection
+
+
+SNAPSHOT_SCHEMA = """
+    CREATE TABLE lemma (
+        slug TEXT PRIMARY KEY,
+        head TEXT NOT NULL,
+        -- JSON, as in the click-in-text API: [{"text": ..., "source_ids": [...]}]
+        definitions TEXT NOT NULL
+    );
+    CREATE TABLE wordform (
+        wordform TEXT NOT NULL,
+        lemma_slug TEXT NOT NULL REFERENCES lemma (slug),
+        PRIMARY KEY (wordform, lemma_slug)
+    ) WITHOUT ROWID;
+"""
+
+
+def build_snapshot(entries: Iterable[dict], path) -> dict:
+    """
+    Writes a dictionary snapshot of the importjson entries to path, replacing
+    any snapshot there. Returns how many lemmas and wordforms it has.
+
+    Each entry with senses is a lemma, and is a wordform of itself; each
+    entry that is the form of (formOf) another is a wordform of that lemma.
+    """
+    entries = list(entries)
+    lemmas = {
+        entry["slug"]: (
+            entry["head"],
+            json.dumps(
+                [
+                    {"text": sense["definition"], "source_ids": sense["sources"]}
+                    for sense in entry["senses"]
+                ]
+            ),
+        )
+        for entry in entries
+        if entry.get("senses") and not entry.get("formOf")
+    }
+    wordforms = {
+        (entry["head"], entry.get("formOf") or entry["slug"]) for entry in entries
+    }
+    wordforms = {(head, slug) for head, slug in wordforms if slug in lemmas}
+
+    path = os.fspath(path)
+    temporary = path + ".tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    connection = sqlite3.connect(temporary)
+    try:
+        with connection:
+            connection.executescript(SNAPSHOT_SCHEMA)
+            connection.executemany(
+                "INSERT INTO lemma VALUES (?, ?, ?)",
+                [
+                    (slug, head, definitions)
+                    for slug, (head, definitions) in lemmas.items()
+                ],
+            )
+            connection.executemany("INSERT INTO wordform VALUES (?, ?)", wordforms)
+    finally:
+        connection.close()
+    # Readers never see a half-written snapshot.
+    os.replace(temporary, path)
+    return {"lemmas": len(lemmas), "wordforms": len(wordforms)}
+
+
+_client: Optional[Union[ItwewinaClient, SnapshotClient]] = None
+_client_lock = threading.Lock()
+
+
+def _forget_client():
+    # A forked worker must not share its parent's connections.
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_client)
+
+
+def client() -> Union[ItwewinaClient, SnapshotClient]:
+    """
+    Returns this process's client for settings.ITWEWINA_SNAPSHOT, if set, or
+    else for settings.ITWEWINA_URL.
+    """
+    global _client
+    with _client_lock:
+        if _client is None and settings.ITWEWINA_SNAPSHOT:
+            _client = SnapshotClient(settings.ITWEWINA_SNAPSHOT)
+        if _client is None:
+            alias = settings.ITWEWINA_CACHE
+            _client = ItwewinaClient(
+                settings.ITWEWINA_URL,
+                shared_cache=caches[alias] if alias else None,
+            )
+        return _client
@@ -15,39 +15,212 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""
+Auto-validates phrases whose field transcription has exactly one matching
+analysis.
+
+Usage:
+
+    python manage.py autoval [--workers 2] [--chunk-size 500] [--restart]
+
+Unvalidated phrases are processed in chunks, in order of id, by a pool of
+worker processes, which share the speller and analyzer. After each chunk, the
+id of its last phrase is written to the checkpoint file, so that an
+interrupted run resumes where it left off. The checkpoint is removed once
+every phrase has been processed; use --restart to ignore it.
+
+Each worker has at most itwewina.MAX_CONCURRENT_LOOKUPS (8) lookups in
+flight, so the public itwêwina gets at most --workers × 8 concurrent requests:
+16 by default. With ITWEWINA_SNAPSHOT set, nothing is sent to itwêwina, and
+it is fine to use a worker per CPU.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+
 from django.conf import settings  # type: ignore
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from simple_history.utils import bulk_update_with_history
 
+from librecval.normalization import to_indexable_form
+from validation import api_cache, itwewina
 from validation.helpers import (
     perfect_match,
     exactly_one_analysis,
+    analysis_statistics,
     get_distance_with_translations,
+    preload_language_tools,
 )
-from validation.models import Phrase
+from validation.models import Phrase, StatisticsSnapshot
 
 from tqdm import tqdm
 
+DEFAULT_CHECKPOINT = "autoval-checkpoint.json"
+
+# Each worker may have itwewina.MAX_CONCURRENT_LOOKUPS requests to the public
+# itwêwina in flight, so only use a few by default.
+DEFAULT_WORKERS = 2
+
+UPDATED_FIELDS = [
+    "transcription",
+    "fuzzy_transcription",
+    "analysis",
+    "status",
+    "validated",
+]
+
 
 class Command(BaseCommand):
     help = "auto-validates phrases"
 
-    def handle(self, *args, **options):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=(
+                f"How many worker processes to use (default: {DEFAULT_WORKERS}). "
+                f"Each sends up to {itwewina.MAX_CONCURRENT_LOOKUPS} "
+                "concurrent requests to itwêwina"
+            ),
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="How many phrases to process (and save) at a time",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=DEFAULT_CHECKPOINT,
+            help=f"Where to record progress (default: {DEFAULT_CHECKPOINT})",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            default=False,
+            help="Start from the first phrase, even if there is a checkpoint",
+        )
+
+    def handle(self, *args, workers, chunk_size, checkpoint, restart, **options):
         """
-        Iterates over all the phrases in the database
+        Iterates over all the unvalidated phrases in the database
         and auto-standardizes wordforms where there is exactly one
         matching analysis
         """
-        phrases = Phrase.objects.all()
-        for phrase in tqdm(phrases.iterator(), total=phrases.count()):
-            if not phrase.validated:
-                segment_name = phrase.field_transcription
-                suggestions = get_distance_with_translations(segment_name)
-                match = perfect_match(segment_name, suggestions)
-
-                # only save the analysis if there is exactly one
-                if exactly_one_analysis(match):
-                    phrase.transcription = match["transcription"]
-                    phrase.analysis = match["matches"][0]["analysis"]
-                    phrase.status = "auto-validated"
-                    phrase.validated = True
-                    phrase.save()
+        if workers < 1 or chunk_size < 1:
+            raise CommandError("--workers and --chunk-size must be at least 1")
+
+        checkpoint = Path(checkpoint)
+        last_id = 0 if restart else read_checkpoint(checkpoint)
+        if last_id:
+            self.stdout.write(f"Resuming after phrase {last_id} (see {checkpoint})")
+
+        unvalidated = Phrase.objects.filter(validated=False).order_by("id")
+        progress = tqdm(total=unvalidated.filter(id__gt=last_id).count())
+
+        # Phrases often share a field transcription: look each one up once.
+        matches: dict = {}
+
+        if workers > 1:
+            # Forked workers share the parent's copy of the speller and analyzer,
+            # but must not share its database connection.
+            preload_language_tools()
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            pool = nullcontext()
+
+        with pool:
+            while chunk := list(unvalidated.filter(id__gt=last_id)[:chunk_size]):
+                new = list(
+                    {phrase.field_transcription for phrase in chunk} - matches.keys()
+                )
+                if workers > 1:
+                    results = pool.map(
+                        find_match, new, chunksize=max(1, len(new) // (workers * 4))
+                    )
+                else:
+                    results = map(find_match, new)
+                matches.update(zip(new, results))
+
+                save_matches(chunk, matches)
+                last_id = chunk[-1].id
+                write_checkpoint(checkpoint, last_id)
+                progress.update(len(chunk))
+
+        progress.close()
+        checkpoint.unlink(missing_ok=True)
+        statistics = analysis_statistics()
+        if statistics is not None:
+            # Only the analyses done in this process (i.e., with --workers 1).
+            self.stdout.write(
+                "FST analyses: {hits} cached, {persistent_hits} persisted, "
+                "{misses} computed ({hit_rate:.0%} not computed)".format(**statistics)
+            )
+
+
+def find_match(field_transcription):
+    """
+    Returns the transcription and analysis of the only suggestion that matches
+    the field transcription, or None.
+    """
+    suggestions = get_distance_with_translations(field_transcription)
+    match = perfect_match(field_transcription, suggestions)
+
+    # only save the analysis if there is exactly one
+    if exactly_one_analysis(match):
+        return match["transcription"], match["matches"][0]["analysis"]
+    return None
+
+
+def save_matches(phrases, matches) -> None:
+    """
+    Auto-validates the phrases that have a match, in bulk.
+    """
+    validated = []
+    for phrase in phrases:
+        match = matches[phrase.field_transcription]
+        if match is None:
+            continue
+        phrase.transcription, phrase.analysis = match
+        # What Phrase.save() would do:
+        phrase.fuzzy_transcription = to_indexable_form(phrase.transcription)
+        phrase.status = "auto-validated"
+        phrase.validated = True
+        validated.append(phrase)
+
+    if not validated:
+        return
+
+    with transaction.atomic():
+        bulk_update_with_history(validated, Phrase, UPDATED_FIELDS)
+        # What the post_save receivers would do, once per language:
+        language_ids = {phrase.language_id for phrase in validated}
+        StatisticsSnapshot.objects.filter(
+            language_id__in=language_ids, is_stale=False
+        ).update(is_stale=True)
+        for language_id in language_ids:
+            transaction.on_commit(partial(api_cache.invalidate_language, language_id))
+
+
+def read_checkpoint(path: Path) -> int:
+    """
+    Returns the id of the last phrase processed, or 0.
+    """
+    try:
+        return json.loads(path.read_text())["last_phrase_id"]
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path: Path, last_id: int) -> None:
+    # Written to a temporary file first, so a crash never leaves half a file.
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_text(json.dumps({"last_phrase_id": last_id}))
+    os.replace(temporary, path)
@@ -0,0 +1,146 @@
+"""
+Loads the speller and the analyzer used for spelling suggestions, and reports
+how long that took and how much memory it used.
+
+Usage:
+
+    python manage.py loadlanguagetools [--workers 10]
+
+Useful to check that crk.zhfst and crk-descriptive-analyzer.hfstol are in
+place, and to measure what preloading them (RECVAL_PRELOAD_LANGUAGE_TOOLS)
+costs each process.
+
+With --workers, forks that many worker processes twice, the way uWSGI does:
+first with each worker loading its own copy of the speller and analyzer, then
+with them loaded once before the fork. Prints the total memory used by the
+workers in each case (Linux only).
+"""
+
+import gc
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+
+from validation import helpers
+
+# Exercised by each worker, so that using the tools is part of the measurement.
+SAMPLE_WORD = "acimosis"
+
+
+class Command(BaseCommand):
+    help = "loads the speller and analyzer, and measures their cost"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Compare the memory used by this many forked workers",
+        )
+
+    def handle(self, *args, workers, **options) -> None:
+        if workers is not None:
+            if workers < 1:
+                raise CommandError("--workers must be at least 1")
+            if not os.path.exists("/proc/self/smaps_rollup"):
+                raise CommandError("--workers needs /proc/<pid>/smaps_rollup")
+            self.compare_workers(workers)
+            return
+
+        for name, load in (
+            ("speller", helpers.get_speller),
+            ("analyzer", helpers.get_analyzer),
+        ):
+            rss_before = resident_set_size()
+            start = time.perf_counter()
+            load()
+            elapsed = time.perf_counter() - start
+            rss_increase = (resident_set_size() - rss_before) / 2**20
+            self.stdout.write(
+                f"Loaded the {name} in {elapsed:.2f}s (RSS +{rss_increase:.1f} MiB)"
+            )
+
+    def compare_workers(self, count: int) -> None:
+        # The first run must happen before this process loads anything.
+        for description, preload in (
+            ("each worker loads its own copy", False),
+            ("loaded once before forking", True),
+        ):
+            if preload:
+                helpers.preload_language_tools()
+                gc.freeze()
+            rss, pss = measure_workers(count)
+            self.stdout.write(
+                f"{count} workers, {description}: "
+                f"total RSS {rss / 2**20:.1f} MiB, "
+                f"total PSS {pss / 2**20:.1f} MiB"
+            )
+        self.stdout.write(
+            "(RSS counts shared pages once per worker; "
+            "PSS splits them between the workers that share them)"
+        )
+
+
+def measure_workers(count: int):
+    """
+    Forks count workers that each use the speller and analyzer, and returns
+    their total RSS and PSS, in bytes, once they all have.
+    """
+    ready_read, ready_write = os.pipe()
+    release_read, release_write = os.pipe()
+    pids = []
+    for _ in range(count):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            os.close(release_write)
+            try:
+                helpers.get_speller().suggest(SAMPLE_WORD)
+                helpers.get_analyzer().lookup(SAMPLE_WORD)
+                os.write(ready_write, b".")
+                # Stay alive until the parent has measured us.
+                os.read(release_read, 1)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    os.close(ready_write)
+    os.close(release_read)
+
+    try:
+        for _ in range(count):
+            if not os.read(ready_read, 1):
+                raise CommandError("A worker failed to load the speller or analyzer")
+        totals = [0, 0]
+        for pid in pids:
+            rollup = memory_rollup(pid)
+            totals[0] += rollup["Rss"]
+            totals[1] += rollup["Pss"]
+        return tuple(totals)
+    finally:
+        os.close(release_write)
+        os.close(ready_read)
+        for pid in pids:
+            os.waitpid(pid, 0)
+
+
+def memory_rollup(pid: int) -> dict:
+    """
+    Returns the sizes, in bytes, in /proc/<pid>/smaps_rollup.
+    """
+    sizes = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            field, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                sizes[field] = int(value.split()[0]) * 1024
+    return sizes
+
+
+def resident_set_size() -> int:
+    """
+    This process's resident set size, in bytes (Linux only; 0 elsewhere).
+    """
+    try:
+        return memory_rollup(os.getpid())["Rss"]
+    except OSError:
+        return 0
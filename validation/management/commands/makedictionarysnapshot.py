@@ -0,0 +1,46 @@
+"""
+Makes a dictionary snapshot from itwêwina's importjson (the file that the
+rapidwords command also reads), so that spelling suggestions and autoval can
+find translations without reaching itwêwina.
+
+Usage:
+
+    python manage.py makedictionarysnapshot path/to/importjson [--output FILE]
+
+Then set ITWEWINA_SNAPSHOT to the path of the snapshot.
+"""
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+
+from validation.itwewina import build_snapshot
+
+DEFAULT_OUTPUT = "itwewina-snapshot.sqlite3"
+
+
+class Command(BaseCommand):
+    help = "makes an offline dictionary snapshot from itwêwina's importjson"
+
+    def add_arguments(self, parser):
+        parser.add_argument("importjson_path", type=Path)
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=Path(DEFAULT_OUTPUT),
+            help=f"Where to write the snapshot (default: {DEFAULT_OUTPUT})",
+        )
+
+    def handle(self, *args, importjson_path, output, **options) -> None:
+        try:
+            with open(importjson_path, "r") as f:
+                importjson = json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"No importjson at {importjson_path}")
+
+        counts = build_snapshot(importjson, output)
+        self.stdout.write(
+            f"Wrote {counts['lemmas']} lemmas and {counts['wordforms']} wordforms "
+            f"to {output}; set ITWEWINA_SNAPSHOT={output.resolve()} to use it."
+        )
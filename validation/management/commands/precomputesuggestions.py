@@ -0,0 +1,136 @@
+"""
+Precomputes the spelling suggestions displayed on the segment page of each
+unvalidated phrase.
+
+Usage:
+
+    python manage.py precomputesuggestions [--workers 2] [--refresh | --stale-only]
+
+Only transcriptions without suggestions are computed, so run this after
+importing phrases, and periodically (e.g., nightly, from cron). Saving a
+phrase queues its transcription; run this with --stale-only frequently (e.g.,
+every few minutes) to only compute the queued ones, so that changed
+transcriptions are ready before a linguist opens them. Pass --refresh to
+recompute every suggestion (e.g., after updating the speller, or itwêwina).
+Segment pages compute (and store) the suggestions of transcriptions missing
+from the table themselves.
+
+Every run also deletes the suggestions of transcriptions that no unvalidated
+phrase displays anymore.
+
+Each worker has at most itwewina.MAX_CONCURRENT_LOOKUPS (8) lookups in
+flight, so the public itwêwina gets at most --workers × 8 concurrent requests:
+16 by default. With ITWEWINA_SNAPSHOT set, nothing is sent to itwêwina, and
+it is fine to use a worker per CPU.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from django.db import connections
+from django.db.models import Value
+from django.db.models.functions import Coalesce, NullIf
+
+from validation import itwewina
+from validation.helpers import (
+    preload_language_tools,
+    store_suggestions,
+    suggestions_with_translations,
+)
+from validation.management.commands.autoval import DEFAULT_WORKERS
+from validation.models import Phrase, PrecomputedSuggestions
+
+from tqdm import tqdm
+
+CHUNK_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = "precomputes the spelling suggestions of unvalidated phrases"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=(
+                f"How many worker processes to use (default: {DEFAULT_WORKERS}). "
+                f"Each sends up to {itwewina.MAX_CONCURRENT_LOOKUPS} "
+                "concurrent requests to itwêwina"
+            ),
+        )
+        freshness = parser.add_mutually_exclusive_group()
+        freshness.add_argument(
+            "--refresh",
+            action="store_true",
+            default=False,
+            help="Recompute the suggestions that were already computed",
+        )
+        freshness.add_argument(
+            "--stale-only",
+            action="store_true",
+            default=False,
+            help="Only compute the transcriptions queued by saving phrases",
+        )
+
+    def handle(self, *args, workers, refresh, stale_only, **options) -> None:
+        if workers < 1:
+            raise CommandError("--workers must be at least 1")
+
+        displayed = (
+            Phrase.objects.filter(validated=False)
+            # The segment page shows the suggestions for this:
+            .annotate(
+                displayed=Coalesce(
+                    NullIf("field_transcription", Value("")), "transcription"
+                )
+            ).values("displayed")
+        )
+        PrecomputedSuggestions.objects.exclude(transcription__in=displayed).delete()
+
+        queued = PrecomputedSuggestions.objects.filter(computed_on__isnull=True)
+        if stale_only:
+            words = set(queued.values_list("transcription", flat=True))
+        else:
+            words = set(displayed.values_list("displayed", flat=True))
+            if not refresh:
+                words -= set(
+                    PrecomputedSuggestions.objects.filter(
+                        computed_on__isnull=False
+                    ).values_list("transcription", flat=True)
+                )
+        words = sorted(words)
+
+        if workers > 1:
+            # Forked workers share the parent's copy of the speller and analyzer,
+            # but must not share its database connection.
+            preload_language_tools()
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            pool = nullcontext()
+
+        incomplete = 0
+        with pool, tqdm(total=len(words)) as progress:
+            for start in range(0, len(words), CHUNK_SIZE):
+                chunk = words[start : start + CHUNK_SIZE]
+                if workers > 1:
+                    results = pool.map(suggestions_with_translations, chunk)
+                else:
+                    results = map(suggestions_with_translations, chunk)
+
+                computed = {}
+                for word, (suggestions, complete) in zip(chunk, results):
+                    if complete:
+                        computed[word] = suggestions
+                    else:
+                        incomplete += 1
+                store_suggestions(computed)
+                progress.update(len(chunk))
+
+        if incomplete:
+            self.stderr.write(
+                f"itwêwina could not be reached for {incomplete} transcriptions; "
+                "run this again to compute their suggestions"
+            )
@@ -0,0 +1,45 @@
+"""
+Recomputes the statistics displayed on each language's statistics page.
+
+Usage:
+
+    python manage.py refreshstatistics [--language maskwacis] [--stale-only]
+
+Run this periodically (e.g., from cron) with --stale-only to only recompute
+the languages whose phrases or recordings changed since the last run.
+"""
+
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+
+from validation.models import LanguageVariant
+from validation.statistics import refresh_statistics_snapshot
+
+
+class Command(BaseCommand):
+    help = "recomputes the statistics snapshot of each language"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--language",
+            help="Code of the LanguageVariant to refresh (default: all languages)",
+        )
+        parser.add_argument(
+            "--stale-only",
+            help="Only refresh languages that changed since their last snapshot",
+            action="store_true",
+            default=False,
+        )
+
+    def handle(self, *args, language, stale_only, **options) -> None:
+        languages = LanguageVariant.objects.all()
+        if language:
+            languages = languages.filter(code=language)
+            if not languages.exists():
+                raise CommandError(f"No language with code {language!r}")
+        if stale_only:
+            # Languages that were never computed are stale, too.
+            languages = languages.exclude(statistics_snapshot__is_stale=False)
+
+        for language_object in languages:
+            self.stdout.write(f"Computing statistics for {language_object}...")
+            refresh_statistics_snapshot(language_object)
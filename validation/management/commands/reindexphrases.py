@@ -20,6 +20,9 @@
 """
 Reindexes phrases (transcriptions, translations) for search.
 
+This also recreates the full-text search index. (`migrate` recreates it by
+itself when a migration altering the Phrase table has dropped its triggers.)
+
 Usage:
 
     python manage.py reindexphrases
@@ -28,6 +31,7 @@ Usage:
 from django.core.management.base import BaseCommand  # type: ignore
 
 from validation.models import Phrase
+from validation.search import install_search_index
 
 
 class Command(BaseCommand):
@@ -46,3 +50,5 @@ class Command(BaseCommand):
         for phrase in phrases:
             phrase.save()
             assert phrase.fuzzy_transcription != default
+
+        install_search_index()
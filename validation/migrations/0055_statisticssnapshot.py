@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "validation",
+            "0054_historicalsemanticclassannotation_dictionary_source_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatisticsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "statistics",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Mapping of statistic description to its value",
+                    ),
+                ),
+                (
+                    "computed_on",
+                    models.DateTimeField(
+                        help_text="When were these statistics computed?"
+                    ),
+                ),
+                (
+                    "is_stale",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Has a phrase or recording of this language changed since?",
+                    ),
+                ),
+                (
+                    "language",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="statistics_snapshot",
+                        to="validation.languagevariant",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("validation", "0055_statisticssnapshot"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="phrase",
+            index=models.Index(
+                fields=["language", "transcription"], name="language_transcription_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,111 @@
+"""
+Creates the full-text search indexes of phrases (SQLite only).
+
+See validation/search.py. The SQL is copied here, rather than imported from
+there, so that this migration keeps doing what it did when it was written.
+"""
+
+from django.db import migrations
+
+INSTALL_SQL = [
+    """
+    CREATE VIRTUAL TABLE validation_phrase_transcription_fts USING fts5(
+        transcription, fuzzy_transcription,
+        content='validation_phrase', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE validation_phrase_translation_fts USING fts5(
+        translation, analysis,
+        content='validation_phrase', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER validation_phrase_fts_insert AFTER INSERT ON validation_phrase
+    BEGIN
+        INSERT INTO validation_phrase_transcription_fts(
+            rowid, transcription, fuzzy_transcription
+        )
+        VALUES (new.id, new.transcription, new.fuzzy_transcription);
+        INSERT INTO validation_phrase_translation_fts(rowid, translation, analysis)
+        VALUES (new.id, new.translation, new.analysis);
+    END
+    """,
+    """
+    CREATE TRIGGER validation_phrase_fts_delete AFTER DELETE ON validation_phrase
+    BEGIN
+        INSERT INTO validation_phrase_transcription_fts(
+            validation_phrase_transcription_fts,
+            rowid, transcription, fuzzy_transcription
+        )
+        VALUES ('delete', old.id, old.transcription, old.fuzzy_transcription);
+        INSERT INTO validation_phrase_translation_fts(
+            validation_phrase_translation_fts, rowid, translation, analysis
+        )
+        VALUES ('delete', old.id, old.translation, old.analysis);
+    END
+    """,
+    """
+    CREATE TRIGGER validation_phrase_fts_update
+    AFTER UPDATE OF transcription, fuzzy_transcription, translation, analysis
+    ON validation_phrase
+    BEGIN
+        INSERT INTO validation_phrase_transcription_fts(
+            validation_phrase_transcription_fts,
+            rowid, transcription, fuzzy_transcription
+        )
+        VALUES ('delete', old.id, old.transcription, old.fuzzy_transcription);
+        INSERT INTO validation_phrase_translation_fts(
+            validation_phrase_translation_fts, rowid, translation, analysis
+        )
+        VALUES ('delete', old.id, old.translation, old.analysis);
+        INSERT INTO validation_phrase_transcription_fts(
+            rowid, transcription, fuzzy_transcription
+        )
+        VALUES (new.id, new.transcription, new.fuzzy_transcription);
+        INSERT INTO validation_phrase_translation_fts(rowid, translation, analysis)
+        VALUES (new.id, new.translation, new.analysis);
+    END
+    """,
+    """
+    INSERT INTO validation_phrase_transcription_fts(
+        validation_phrase_transcription_fts
+    )
+    VALUES ('rebuild')
+    """,
+    """
+    INSERT INTO validation_phrase_translation_fts(validation_phrase_translation_fts)
+    VALUES ('rebuild')
+    """,
+]
+
+UNINSTALL_SQL = [
+    "DROP TRIGGER IF EXISTS validation_phrase_fts_insert",
+    "DROP TRIGGER IF EXISTS validation_phrase_fts_delete",
+    "DROP TRIGGER IF EXISTS validation_phrase_fts_update",
+    "DROP TABLE IF EXISTS validation_phrase_transcription_fts",
+    "DROP TABLE IF EXISTS validation_phrase_translation_fts",
+]
+
+
+def run(statements):
+    def run_on_sqlite(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run_on_sqlite
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("validation", "0056_language_transcription_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(run(INSTALL_SQL), run(UNINSTALL_SQL)),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("validation", "0057_phrase_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FSTAnalysis",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "fst_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the analyzer that produced the analysis",
+                        max_length=64,
+                    ),
+                ),
+                ("wordform", models.CharField(max_length=256)),
+                (
+                    "analysis",
+                    models.CharField(
+                        blank=True,
+                        help_text="The analysis of the wordform (blank if it has none)",
+                        max_length=256,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="fstanalysis",
+            constraint=models.UniqueConstraint(
+                fields=("fst_hash", "wordform"), name="unique_analysis_per_fst"
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("validation", "0058_fstanalysis"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PrecomputedSuggestions",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "transcription",
+                    models.CharField(
+                        help_text="The (field) transcription the suggestions are for",
+                        max_length=256,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "suggestions",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Mapping of suggestion to its MED and matches, closest first",
+                    ),
+                ),
+                (
+                    "computed_on",
+                    models.DateTimeField(help_text="When were these computed?"),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("validation", "0059_precomputedsuggestions"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="precomputedsuggestions",
+            name="computed_on",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When were these computed? (blank until they are)",
+                null=True,
+            ),
+        ),
+    ]
@@ -18,13 +18,14 @@
 
 import re
 import unicodedata
+from functools import partial
 from pathlib import Path
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models.signals import pre_save
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from simple_history.models import HistoricalRecords
@@ -32,6 +33,8 @@ from simple_history.models import HistoricalRecords
 from librecval.normalization import normalize_sro, to_indexable_form, normalize_phrase
 from librecval.recording_session import Location, SessionID, TimeOfDay
 
+from . import api_cache
+
 User = get_user_model()
 
 
@@ -378,6 +381,11 @@ class Phrase(models.Model):
             ),
             # DEPRECATED: Allow for rapid look-up on the transcription
             models.Index(fields=("transcription",), name="transcription_idx"),
+            # Supports prefix searches (e.g., autocompletion) within a language.
+            models.Index(
+                fields=("language", "transcription"),
+                name="language_transcription_idx",
+            ),
         ]
 
     @property
@@ -522,12 +530,14 @@ class Speaker(models.Model):
         """
         Which language this person speaks.
         """
-        # Hard-coded for now, but it makes implementing this field trival.
-        return [
-            language.name
-            for language in LanguageVariant.objects.all()
-            if language in self.languages.all()
-        ]
+        return [language.name for language in self.spoken_languages()]
+
+    def spoken_languages(self) -> list:
+        """
+        The languages this person speaks, oldest first. Costs no queries when
+        the languages were prefetched, and one otherwise.
+        """
+        return sorted(self.languages.all(), key=lambda language: language.pk)
 
     @property
     def anonymous(self):
@@ -551,8 +561,9 @@ class Speaker(models.Model):
         """
         Returns a URL for where to find the speaker bio.
         """
-        if self.language:
-            lang_code = LanguageVariant.objects.get(name=self.language[0]).code
+        languages = self.spoken_languages()
+        if languages:
+            lang_code = languages[0].code
             return f"https://speech-db.altlab.app/{lang_code}/speakers/{self.code}"
         else:
             return "https://speech-db.altlab.app/maskwacis/speakers/"
@@ -742,24 +753,44 @@ class Recording(models.Model):
         """
         return self.compressed_audio.url
 
-    def as_json(self, request):
+    def as_json(self, request, speakers=None):
         """
         Returns JSON that API clients expect for a single recording.
+
+        When serializing many recordings, pass speakers=speaker_api_details(...)
+        so that the speakers' languages are not queried once per recording.
         """
+        if speakers is None:
+            language = self.speaker.language
+            speaker_bio_url = self.speaker.get_absolute_url()
+        else:
+            language, speaker_bio_url = speakers[self.speaker_id]
         return {
             "wordform": self.phrase.transcription,
             "speaker": self.speaker.code,
             "speaker_name": self.speaker.full_name,
             "anonymous": self.speaker.anonymous,
             "gender": self.speaker.gender,
-            "language": self.speaker.language,
+            "language": language,
             "recording_url": request.build_absolute_uri(self.get_absolute_url()),
-            "speaker_bio_url": request.build_absolute_uri(
-                self.speaker.get_absolute_url()
-            ),
+            "speaker_bio_url": request.build_absolute_uri(speaker_bio_url),
             "is_best": self.is_best,
         }
 
+    @staticmethod
+    def speaker_api_details(recordings) -> dict:
+        """
+        Returns {speaker code: (Speaker.language, Speaker.get_absolute_url())}
+        for the speakers of the given recordings, in one query, for use with
+        as_json(). The recordings should have been fetched with their speakers.
+        """
+        speakers = {recording.speaker_id: recording.speaker for recording in recordings}
+        models.prefetch_related_objects(list(speakers.values()), "languages")
+        return {
+            code: (speaker.language, speaker.get_absolute_url())
+            for code, speaker in speakers.items()
+        }
+
     @staticmethod
     def get_path_to_audio_directory() -> Path:
         """
@@ -826,6 +857,179 @@ class Issue(models.Model):
     )
 
 
+class StatisticsSnapshot(models.Model):
+    """
+    Precomputed statistics for a language, as displayed on the statistics page.
+
+    Computing the statistics requires scanning every phrase, recording and
+    history entry of the language, so they are computed ahead of time with:
+
+        python manage.py refreshstatistics
+    """
+
+    language = models.OneToOneField(
+        LanguageVariant,
+        on_delete=models.CASCADE,
+        related_name="statistics_snapshot",
+    )
+
+    statistics = models.JSONField(
+        help_text="Mapping of statistic description to its value", default=dict
+    )
+
+    computed_on = models.DateTimeField(help_text="When were these statistics computed?")
+
+    is_stale = models.BooleanField(
+        help_text="Has a phrase or recording of this language changed since?",
+        default=False,
+    )
+
+    def __str__(self) -> str:
+        return f"Statistics for {self.language} ({self.computed_on:%Y-%m-%d %H:%M})"
+
+
+class PrecomputedSuggestions(models.Model):
+    """
+    The spelling suggestions for a transcription, as displayed on the segment
+    page (see helpers.get_distance_with_translations()).
+
+    Computing them takes a speller, itwêwina, and the analyzer, so the
+    suggestions for unvalidated phrases are computed ahead of time with:
+
+        python manage.py precomputesuggestions
+
+    Saving a phrase queues its transcription: a row without computed_on, for
+    `precomputesuggestions --stale-only` to compute.
+    """
+
+    transcription = models.CharField(
+        help_text="The (field) transcription the suggestions are for",
+        max_length=Phrase.MAX_TRANSCRIPTION_LENGTH,
+        unique=True,
+    )
+
+    suggestions = models.JSONField(
+        help_text="Mapping of suggestion to its MED and matches, closest first",
+        default=dict,
+    )
+
+    computed_on = models.DateTimeField(
+        help_text="When were these computed? (blank until they are)",
+        blank=True,
+        null=True,
+    )
+
+    def __str__(self) -> str:
+        return f"Suggestions for {self.transcription}"
+
+
+class FSTAnalysis(models.Model):
+    """
+    The analysis of a wordform by the FST analyzer, persisted by
+    validation.analysis_cache when RECVAL_PERSIST_FST_ANALYSES is set.
+    """
+
+    fst_hash = models.CharField(
+        help_text="SHA-256 of the analyzer that produced the analysis",
+        max_length=64,
+    )
+
+    wordform = models.CharField(max_length=256)
+
+    analysis = models.CharField(
+        help_text="The analysis of the wordform (blank if it has none)",
+        blank=True,
+        max_length=256,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fst_hash", "wordform"], name="unique_analysis_per_fst"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.wordform}: {self.analysis}"
+
+
+@receiver(post_save, sender=Phrase)
+@receiver(post_delete, sender=Phrase)
+def mark_phrase_statistics_stale(sender, instance, **kwargs):
+    """
+    Flags the language's statistics as out of date, so that
+    `refreshstatistics --stale-only` knows which languages to recompute.
+    """
+    StatisticsSnapshot.objects.filter(
+        language_id=instance.language_id, is_stale=False
+    ).update(is_stale=True)
+
+
+@receiver(post_save, sender=Recording)
+@receiver(post_delete, sender=Recording)
+def mark_recording_statistics_stale(sender, instance, **kwargs):
+    """
+    Same as above, but for the language of the recording's phrase.
+    """
+    StatisticsSnapshot.objects.filter(
+        language__phrase=instance.phrase_id, is_stale=False
+    ).update(is_stale=True)
+
+
+@receiver(post_save, sender=Phrase)
+def queue_phrase_suggestions(sender, instance, update_fields=None, **kwargs):
+    """
+    Queues the spelling suggestions of the transcription shown on the phrase's
+    segment page, unless they are already computed (or queued), so that
+    `precomputesuggestions --stale-only` computes them before a linguist asks.
+    """
+    if instance.validated:
+        return
+    if update_fields is not None and not {
+        "field_transcription",
+        "transcription",
+        "validated",
+    }.intersection(update_fields):
+        return
+
+    PrecomputedSuggestions.objects.bulk_create(
+        [
+            PrecomputedSuggestions(
+                transcription=instance.field_transcription or instance.transcription
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+@receiver(post_save, sender=Phrase)
+@receiver(post_delete, sender=Phrase)
+def invalidate_phrase_api_responses(sender, instance, **kwargs):
+    """
+    Forgets the cached recordings API responses for the phrase's language,
+    once the change is committed.
+    """
+    transaction.on_commit(partial(api_cache.invalidate_language, instance.language_id))
+
+
+@receiver(post_save, sender=Recording)
+@receiver(post_delete, sender=Recording)
+def invalidate_recording_api_responses(sender, instance, **kwargs):
+    language_ids = Phrase.objects.filter(id=instance.phrase_id).values_list(
+        "language_id", flat=True
+    )
+    for language_id in language_ids:
+        transaction.on_commit(partial(api_cache.invalidate_language, language_id))
+
+
+@receiver(post_save, sender=Speaker)
+@receiver(post_delete, sender=Speaker)
+@receiver(m2m_changed, sender=Speaker.languages.through)
+def invalidate_speaker_api_responses(sender, instance, **kwargs):
+    # Speakers appear in the responses of every language they recorded in.
+    transaction.on_commit(api_cache.invalidate_all)
+
+
 # ############################### Utilities ############################### #
 
 
@@ -0,0 +1,376 @@
+"""
+Full-text search over phrases.
+
+On SQLite, phrases are indexed by two FTS5 tables that are kept in sync with
+the validation_phrase table by triggers:
+
+ - the transcription index (transcription, fuzzy_transcription) uses the
+   trigram tokenizer, so it answers substring queries of three or more
+   characters;
+ - the translation index (translation, analysis) uses the unicode61
+   tokenizer, so it answers word (prefix) queries.
+
+Terms the indexes cannot answer, and every term on other database backends,
+fall back to plain substring (LIKE) matching.
+"""
+
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from librecval.edit_distance import weighted_edit_distance
+from librecval.normalization import to_indexable_form
+
+from .models import Phrase
+
+TRANSCRIPTION_INDEX = "validation_phrase_transcription_fts"
+TRANSLATION_INDEX = "validation_phrase_translation_fts"
+
+INDEXED_FIELDS = {
+    "transcription": TRANSCRIPTION_INDEX,
+    "fuzzy_transcription": TRANSCRIPTION_INDEX,
+    "translation": TRANSLATION_INDEX,
+    "analysis": TRANSLATION_INDEX,
+}
+
+# The trigram tokenizer cannot match anything shorter than a trigram.
+MIN_TRIGRAM_TERM_LENGTH = 3
+
+# How many phrases sharing trigrams with a misspelled query are re-ranked by
+# edit distance, and how far off they may be (one edit, or a few free ones).
+MAX_FUZZY_CANDIDATES = 50
+MAX_FUZZY_DISTANCE = 1.0
+
+# Queries with up to this many trigrams get a clause per position an edit may
+# be at; longer ones, three (see _close_transcription_query()).
+MAX_WINDOWED_TRIGRAMS = 8
+
+TRIGGERS = [
+    "validation_phrase_fts_insert",
+    "validation_phrase_fts_delete",
+    "validation_phrase_fts_update",
+]
+
+# Recreates the indexes from scratch. Note that Django's SQLite backend
+# rebuilds validation_phrase (dropping its triggers!) whenever a migration
+# alters it; repair_search_index() then reinstalls the index after migrating.
+INSTALL_SEARCH_INDEX_SQL = [
+    f"DROP TABLE IF EXISTS {TRANSCRIPTION_INDEX}",
+    f"DROP TABLE IF EXISTS {TRANSLATION_INDEX}",
+    f"""
+    CREATE VIRTUAL TABLE {TRANSCRIPTION_INDEX} USING fts5(
+        transcription, fuzzy_transcription,
+        content='validation_phrase', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE {TRANSLATION_INDEX} USING fts5(
+        translation, analysis,
+        content='validation_phrase', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    *(f"DROP TRIGGER IF EXISTS {trigger}" for trigger in TRIGGERS),
+    f"""
+    CREATE TRIGGER validation_phrase_fts_insert AFTER INSERT ON validation_phrase
+    BEGIN
+        INSERT INTO {TRANSCRIPTION_INDEX}(rowid, transcription, fuzzy_transcription)
+        VALUES (new.id, new.transcription, new.fuzzy_transcription);
+        INSERT INTO {TRANSLATION_INDEX}(rowid, translation, analysis)
+        VALUES (new.id, new.translation, new.analysis);
+    END
+    """,
+    f"""
+    CREATE TRIGGER validation_phrase_fts_delete AFTER DELETE ON validation_phrase
+    BEGIN
+        INSERT INTO {TRANSCRIPTION_INDEX}(
+            {TRANSCRIPTION_INDEX}, rowid, transcription, fuzzy_transcription
+        )
+        VALUES ('delete', old.id, old.transcription, old.fuzzy_transcription);
+        INSERT INTO {TRANSLATION_INDEX}(
+            {TRANSLATION_INDEX}, rowid, translation, analysis
+        )
+        VALUES ('delete', old.id, old.translation, old.analysis);
+    END
+    """,
+    f"""
+    CREATE TRIGGER validation_phrase_fts_update
+    AFTER UPDATE OF transcription, fuzzy_transcription, translation, analysis
+    ON validation_phrase
+    BEGIN
+        INSERT INTO {TRANSCRIPTION_INDEX}(
+            {TRANSCRIPTION_INDEX}, rowid, transcription, fuzzy_transcription
+        )
+        VALUES ('delete', old.id, old.transcription, old.fuzzy_transcription);
+        INSERT INTO {TRANSLATION_INDEX}(
+            {TRANSLATION_INDEX}, rowid, translation, analysis
+        )
+        VALUES ('delete', old.id, old.translation, old.analysis);
+        INSERT INTO {TRANSCRIPTION_INDEX}(rowid, transcription, fuzzy_transcription)
+        VALUES (new.id, new.transcription, new.fuzzy_transcription);
+        INSERT INTO {TRANSLATION_INDEX}(rowid, translation, analysis)
+        VALUES (new.id, new.translation, new.analysis);
+    END
+    """,
+    f"INSERT INTO {TRANSCRIPTION_INDEX}({TRANSCRIPTION_INDEX}) VALUES ('rebuild')",
+    f"INSERT INTO {TRANSLATION_INDEX}({TRANSLATION_INDEX}) VALUES ('rebuild')",
+]
+
+UNINSTALL_SEARCH_INDEX_SQL = [
+    *(f"DROP TRIGGER IF EXISTS {trigger}" for trigger in TRIGGERS),
+    f"DROP TABLE IF EXISTS {TRANSCRIPTION_INDEX}",
+    f"DROP TABLE IF EXISTS {TRANSLATION_INDEX}",
+]
+
+
+def is_search_index_supported(conn=connection) -> bool:
+    return conn.vendor == "sqlite"
+
+
+def install_search_index(conn=connection) -> None:
+    """
+    (Re)creates the full-text indexes and their triggers, and indexes every
+    existing phrase. Does nothing on backends other than SQLite.
+    """
+    if not is_search_index_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        for statement in INSTALL_SEARCH_INDEX_SQL:
+            cursor.execute(statement)
+
+
+def repair_search_index(sender=None, using=DEFAULT_DB_ALIAS, **kwargs) -> None:
+    """
+    Reinstalls the full-text indexes when their triggers are gone, since the
+    indexes went stale when the triggers were dropped. Connected to
+    post_migrate, because that is how the triggers get dropped (see
+    INSTALL_SEARCH_INDEX_SQL). Does nothing if the indexes were never
+    installed (e.g., after unapplying their migration).
+    """
+    conn = connections[using]
+    if not is_search_index_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s)"
+            % ", ".join(["%s"] * (2 + len(TRIGGERS))),
+            [TRANSCRIPTION_INDEX, TRANSLATION_INDEX, *TRIGGERS],
+        )
+        existing = {name for (name,) in cursor.fetchall()}
+    indexes_installed = {TRANSCRIPTION_INDEX, TRANSLATION_INDEX} <= existing
+    if indexes_installed and not set(TRIGGERS) <= existing:
+        install_search_index(conn)
+
+
+def uninstall_search_index(conn=connection) -> None:
+    if not is_search_index_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        for statement in UNINSTALL_SEARCH_INDEX_SQL:
+            cursor.execute(statement)
+
+
+def phrase_search_terms(query: str) -> dict:
+    """
+    The terms of a simple search: the query may appear in the transcription
+    (exactly or fuzzily) or in the translation.
+    """
+    if not query:
+        return {}
+    return {
+        "transcription": query,
+        "fuzzy_transcription": to_indexable_form(query),
+        "translation": query,
+    }
+
+
+def text_matches(terms: dict) -> Q:
+    """
+    Returns a filter for phrases where ANY of the given fields contains its
+    term, e.g.,
+
+        Phrase.objects.filter(text_matches({"transcription": "acimosis"}))
+
+    Empty terms are ignored.
+    """
+    unindexed, expressions = _plan_search(terms)
+    filters = [Q(**{f"{field}__contains": term}) for field, term in unindexed.items()]
+    for index, expression in expressions.items():
+        filters.append(
+            Q(
+                id__in=RawSQL(
+                    f"SELECT rowid FROM {index} WHERE {index} MATCH %s", [expression]
+                )
+            )
+        )
+    if not filters:
+        return Q()
+    return reduce(or_, filters)
+
+
+def order_by_relevance(queryset, terms: dict):
+    """
+    Orders phrases matching text_matches(terms) from most to least relevant,
+    then by transcription.
+
+    Relevance is the sum of the BM25 scores from each full-text index. Terms
+    that fall back to LIKE (e.g., very short queries) match too many phrases
+    to score cheaply, so those searches are simply ordered by transcription.
+    """
+    unindexed, expressions = _plan_search(terms)
+    if unindexed or not expressions:
+        return queryset.order_by("transcription")
+
+    phrase_id = f'"{Phrase._meta.db_table}"."id"'
+    scores = [
+        f"COALESCE((SELECT rank FROM {index} WHERE {index} MATCH %s"
+        f" AND rowid = {phrase_id}), 0)"
+        for index in expressions
+    ]
+    relevance = RawSQL(" + ".join(scores), list(expressions.values()))
+    return queryset.annotate(relevance=relevance).order_by("relevance", "transcription")
+
+
+def close_transcriptions(query: str, language=None) -> dict:
+    """
+    Finds phrases whose transcription is spelled almost like the query, for
+    when a search finds nothing as typed.
+
+    Candidates are the best-ranked phrases that could be one edit away from
+    the query's fuzzy (indexable) form, judging by its trigrams (see
+    _close_transcription_query()); they are re-ranked with a weighted edit
+    distance. Returns {phrase id: distance}, closest first. Only supported on
+    SQLite.
+    """
+    form = to_indexable_form(query or "")
+    if len(form) < MIN_TRIGRAM_TERM_LENGTH or not is_search_index_supported():
+        return {}
+
+    sql = (
+        f"SELECT phrase.id, phrase.fuzzy_transcription FROM {TRANSCRIPTION_INDEX}"
+        f" JOIN {Phrase._meta.db_table} AS phrase"
+        f" ON phrase.id = {TRANSCRIPTION_INDEX}.rowid"
+        f" WHERE {TRANSCRIPTION_INDEX} MATCH %s"
+    )
+    params: list = [_close_transcription_query(form)]
+    if language is not None:
+        sql += " AND phrase.language_id = %s"
+        params.append(language.id)
+    sql += f" ORDER BY {TRANSCRIPTION_INDEX}.rank LIMIT %s"
+    params.append(MAX_FUZZY_CANDIDATES)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        candidates = cursor.fetchall()
+
+    distances = {
+        phrase_id: weighted_edit_distance(
+            form, fuzzy_transcription, maximum=MAX_FUZZY_DISTANCE
+        )
+        for phrase_id, fuzzy_transcription in candidates
+    }
+    return {
+        phrase_id: distance
+        for phrase_id, distance in sorted(distances.items(), key=lambda kv: kv[1])
+        if distance <= MAX_FUZZY_DISTANCE
+    }
+
+
+def _close_transcription_query(form: str) -> str:
+    """
+    Returns the FTS5 query for the phrases that could be one edit away from
+    the fuzzy transcription.
+
+    An edit changes at most three consecutive trigrams of the form, so those
+    phrases have every other trigram. Short forms get a clause for each
+    position of the edit:
+
+    >>> _close_transcription_query("nipiyak")
+    'fuzzy_transcription : (("iya" AND "yak") OR ("nip" AND "yak") OR ("ipi" AND "nip"))'
+
+    Longer forms are split into three blocks, one of which the edit leaves
+    whole. Forms of three trigrams or fewer may lose all but one:
+
+    >>> _close_transcription_query("atim")
+    'fuzzy_transcription : (("ati") OR ("tim"))'
+
+    Matching every trigram separately instead would find (and rank) tens of
+    thousands of phrases for common trigrams like "ski" or "iya".
+    """
+    trigrams = [form[i : i + 3] for i in range(len(form) - 2)]
+    count = len(trigrams)
+    if count <= 3:
+        groups = [[trigram] for trigram in trigrams]
+    elif count <= MAX_WINDOWED_TRIGRAMS:
+        groups = [trigrams[:edit] + trigrams[edit + 3 :] for edit in range(count - 2)]
+    else:
+        groups = [
+            trigrams[count * block // 3 : count * (block + 1) // 3]
+            for block in range(3)
+        ]
+
+    clauses = {
+        " AND ".join(
+            _index_query(TRANSCRIPTION_INDEX, trigram) for trigram in sorted(set(group))
+        ): None
+        for group in groups
+    }
+    return "fuzzy_transcription : (%s)" % " OR ".join(
+        f"({clause})" for clause in clauses
+    )
+
+
+def _plan_search(terms: dict):
+    """
+    Splits the terms into those that must be matched with LIKE, and the FTS5
+    MATCH expression to run against each index for the rest.
+    """
+    unindexed = {}
+    queries: dict = {}
+    for field, term in terms.items():
+        if not term:
+            continue
+        index = INDEXED_FIELDS.get(field) if is_search_index_supported() else None
+        query = _index_query(index, term) if index else None
+        if query is None:
+            unindexed[field] = term
+        else:
+            queries.setdefault(index, []).append(f"{field} : {query}")
+
+    expressions = {index: " OR ".join(parts) for index, parts in queries.items()}
+    return unindexed, expressions
+
+
+def _index_query(index: str, term: str):
+    """
+    Converts a search term to an FTS5 query for the given index, or None if
+    the index cannot answer it.
+
+    The transcription index matches the term as a substring:
+
+    >>> _index_query(TRANSCRIPTION_INDEX, 'tân"si')
+    '"tân""si"'
+    >>> _index_query(TRANSCRIPTION_INDEX, "ac") is None
+    True
+
+    The translation index matches the words in order, the last one as a prefix:
+
+    >>> _index_query(TRANSLATION_INDEX, "s/he hook")
+    '"s he hook" *'
+    >>> _index_query(TRANSLATION_INDEX, "...") is None
+    True
+    """
+    if index == TRANSCRIPTION_INDEX:
+        if len(term) < MIN_TRIGRAM_TERM_LENGTH:
+            return None
+        return '"' + term.replace('"', '""') + '"'
+
+    words = re.findall(r"\w+", term)
+    if not words:
+        return None
+    return '"' + " ".join(words) + '" *'
@@ -0,0 +1,170 @@
+"""
+Statistics about the phrases and recordings of a language.
+
+Computing these is expensive, so the statistics page displays a snapshot
+that is refreshed by the refreshstatistics management command.
+"""
+
+from collections import Counter
+
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import (
+    HistoricalPhrase,
+    HistoricalRecording,
+    Phrase,
+    Recording,
+    StatisticsSnapshot,
+)
+
+
+def get_statistics_snapshot(language) -> StatisticsSnapshot:
+    """
+    Returns the statistics snapshot of the language, computing it if it
+    has never been computed before.
+    """
+    try:
+        return language.statistics_snapshot
+    except StatisticsSnapshot.DoesNotExist:
+        return refresh_statistics_snapshot(language)
+
+
+def refresh_statistics_snapshot(language) -> StatisticsSnapshot:
+    """
+    (Re)computes the statistics of the language and stores them.
+    """
+    snapshot, _ = StatisticsSnapshot.objects.update_or_create(
+        language=language,
+        defaults=dict(
+            statistics=collect_statistics(language),
+            computed_on=timezone.now(),
+            is_stale=False,
+        ),
+    )
+    return snapshot
+
+
+def collect_statistics(language):
+    """
+    Computes all the statistics of the language in a handful of queries:
+    the counts are conditional aggregates over a single scan of the phrases
+    and a single scan of the recordings of the language.
+    """
+    phrases = Phrase.objects.filter(language=language)
+    recordings = Recording.objects.filter(phrase__language=language)
+
+    touched_by_human = ~Q(history_user=None)
+    phrase_touched = Exists(
+        HistoricalPhrase.objects.filter(touched_by_human, id=OuterRef("id"))
+    )
+    recording_touched = Exists(
+        HistoricalRecording.objects.filter(touched_by_human, id=OuterRef("id"))
+    )
+
+    not_validated = ~Q(validated=True)
+    new_word = Q(origin=Phrase.NEW_WORD)
+    counts = phrases.aggregate(
+        entries=Count("id"),
+        distinct_transcriptions=Count("transcription", distinct=True),
+        touched=Count("id", filter=phrase_touched),
+        empty_analysis=Count("id", filter=Q(analysis="")),
+        green=Count("id", filter=Q(validated=True)),
+        red=Count("id", filter=not_validated & Q(status=Phrase.REVIEW)),
+        grey=Count("id", filter=not_validated & ~Q(status=Phrase.REVIEW)),
+        not_new_word=Count("id", filter=~new_word),
+        marked_good=Count("id", filter=new_word & Q(status=Phrase.LINKED)),
+        marked_review=Count("id", filter=new_word & Q(status=Phrase.REVIEW)),
+        marked_idk=Count(
+            "id",
+            filter=new_word & ~Q(status=Phrase.LINKED) & ~Q(status=Phrase.REVIEW),
+        ),
+    )
+    words, lengths = count_words(phrases)
+
+    stats = {
+        "Number of entries (words/phrases)": counts["entries"],
+        "Number of distinct transcriptions": counts["distinct_transcriptions"],
+        "Total distinct words (including as part of sentences)": words,
+        "Number of entries touched by a human in speech-db": counts["touched"],
+        "Number of entries with an empty linguistic analysis": counts["empty_analysis"],
+        "Number of entries with a green heading": counts["green"],
+        "Number of entries with a red heading": counts["red"],
+        "Number of entries with a grey heading": counts["grey"],
+        "Number of entries with an origin different than new word": counts[
+            "not_new_word"
+        ],
+        "Number of entries manually marked good": counts["marked_good"],
+        "Number of entries manually marked needs review": counts[
+            "marked_review"
+        ],  # TODO Separate No/IDK
+        "Number of entries where the 'I don't know' button appears marked": counts[
+            "marked_idk"
+        ],
+    }
+    for key, value in lengths.most_common():
+        ending = "s" if int(key) > 1 else ""
+        stats[f"Number of transcriptions with {key} word{ending}"] = value
+
+    unissued = Q(wrong_word=False, wrong_speaker=False, is_user_submitted=False)
+    counts = recordings.aggregate(
+        total=Count("id"),
+        unissued=Count("id", filter=unissued),
+        good=Count("id", filter=unissued & Q(quality=Recording.GOOD)),
+        bad=Count("id", filter=Q(quality=Recording.BAD)),
+        unknown=Count("id", filter=unissued & Q(quality=Recording.UNKNOWN)),
+        best=Count("id", filter=Q(is_best=True)),
+        touched=Count("id", filter=recording_touched),
+    )
+    stats["Total recordings"] = counts["total"]
+    stats["Total recordings without declared issues"] = counts["unissued"]
+    stats["Total recordings marked good quality"] = counts["good"]
+    stats["Total recordings marked bad quality"] = counts["bad"]
+    stats["Total recordings marked unknown quality"] = counts["unknown"]
+    stats["Total recordings marked best"] = counts["best"]
+    stats["Total recordings touched by a human"] = counts["touched"]
+
+    # Phrases without any recordings count as both "all" and "no" recordings touched.
+    all_touched = some_touched = none_touched = phrases_with_recordings = 0
+    per_phrase = (
+        recordings.values("phrase")
+        .annotate(total=Count("id"), touched=Count("id", filter=recording_touched))
+        .values_list("total", "touched")
+        .order_by()
+    )
+    for total, touched in per_phrase.iterator():
+        phrases_with_recordings += 1
+        all_touched += total == touched
+        some_touched += touched > 0
+        none_touched += touched == 0
+    without_recordings = stats["Number of entries (words/phrases)"]
+    without_recordings -= phrases_with_recordings
+
+    stats[
+        "Total phrases where all recordings have been touched by a human in speech-db"
+    ] = (all_touched + without_recordings)
+    stats[
+        "Total phrases where some recordings have been touched by a human in speech-db"
+    ] = some_touched
+    stats[
+        "Total phrases where no recordings have been touched by a human in speech-db"
+    ] = (none_touched + without_recordings)
+    return stats
+
+
+def count_words(phrases):
+    """
+    Returns the number of distinct words in the transcriptions of the phrases,
+    and a Counter of how many distinct transcriptions have each number of words.
+    Transcriptions are streamed from the database rather than loaded at once.
+    """
+    words = set()
+    lengths = Counter()
+    transcriptions = (
+        phrases.values_list("transcription", flat=True).distinct().order_by()
+    )
+    for transcription in transcriptions.iterator():
+        split = transcription.split(" ")
+        lengths[len(split)] += 1
+        words.update(split)
+    return len(words), lengths
@@ -0,0 +1,206 @@
+"""
+Tests for compiling the advanced search form into queries.
+"""
+
+import pytest  # type: ignore
+from django.core.cache import cache
+from django.http import QueryDict
+from django.shortcuts import reverse  # type: ignore
+from model_bakery import baker  # type: ignore
+
+from validation.advanced_search import compile_search, count_facets
+from validation.models import Phrase, Recording, SemanticClassAnnotation, Speaker
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("", {"acimosis", "minôs", "atim", "nipiy ekwa"}),
+        # Text fields are alternatives:
+        ("transcription=acimosis", {"acimosis"}),
+        ("transcription=acimosis&translation=cat", {"acimosis", "minôs"}),
+        ("transcription=acim&exact=exact", set()),
+        ("transcription=acimosis&exact=exact&analysis=atim", {"acimosis", "atim"}),
+        ("lemma=minôs", {"minôs"}),
+        # ...other fields narrow them down:
+        ("transcription=acimosis&translation=cat&status=linked", {"minôs"}),
+        ("translation=cat&kind=word", {"minôs"}),
+        ("kind=sentence", {"nipiy ekwa"}),
+        ("status=not-checked", {"acimosis", "nipiy ekwa"}),
+        ("status=grey-card", {"acimosis", "nipiy ekwa", "minôs"}),
+        ("status=all&kind=all", {"acimosis", "minôs", "atim", "nipiy ekwa"}),
+        ("semantic_class=animal", {"acimosis", "minôs"}),
+        (
+            "semantic_class=animal&semantic-class-source=manual+classification",
+            {"minôs"},
+        ),
+        ("speaker-options=MAR", {"acimosis", "minôs"}),
+        # Quality and speaker apply to the same recording:
+        ("speaker-options=MAR&quality=good", {"minôs"}),
+        ("speaker-options=LOU&quality=bad", {"atim"}),
+        (
+            "speaker-options=all&quality=all",
+            {"acimosis", "minôs", "atim", "nipiy ekwa"},
+        ),
+    ],
+)
+def test_compile_search(phrases, query, expected):
+    language = phrases["acimosis"].language
+
+    results = compile_search(QueryDict(query)).phrases(language)
+
+    assert {phrase.transcription for phrase in results} == expected
+
+
+@pytest.mark.django_db
+def test_speaker_filter_does_not_duplicate_phrases(phrases):
+    language = phrases["acimosis"].language
+    speaker = Recording.objects.filter(phrase=phrases["minôs"])[0].speaker
+    baker.make_recipe(
+        "validation.recording",
+        phrase=phrases["minôs"],
+        speaker=speaker,
+        compressed_audio="audio/mock_recording.m4a",
+    )
+
+    results = compile_search(QueryDict("speaker-options=MAR")).phrases(language)
+
+    assert len(results) == len(set(results)) == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ("query", "index"),
+    [
+        ("transcription=acimosis&exact=exact", "language_transcription_idx"),
+        ("transcription=acimosis", "validation_phrase_transcription_fts"),
+        ("speaker-options=MAR", "validation_recording_phrase_id"),
+        ("semantic_class=animal", "validation_semanticclassannotation_phrase_id"),
+    ],
+)
+def test_searches_use_indexes(phrases, query, index):
+    language = phrases["acimosis"].language
+
+    plan = compile_search(QueryDict(query)).phrases(language).explain()
+
+    assert index in plan
+    assert "SCAN validation_phrase\n" not in plan + "\n"
+
+
+@pytest.mark.django_db
+def test_count_facets(phrases, django_assert_max_num_queries):
+    language = phrases["acimosis"].language
+    plan = compile_search(QueryDict("status=linked&speaker-options=MAR"))
+
+    with django_assert_max_num_queries(5):
+        counts = count_facets(plan, language)
+
+    # Each facet is counted as if its own choice were not made:
+    assert counts["status"] == {
+        "new": 1,
+        "linked": 1,
+        "auto-validated": 0,
+        "user-submitted": 0,
+        "needs-review": 0,
+        "not-checked": 1,
+        "grey-card": 2,
+    }
+    assert counts["speaker"] == {"MAR": 1, "LOU": 1}
+    assert counts["kind"] == {"word": 1, "sentence": 0}
+    assert counts["quality"] == {"good": 1}
+    assert counts["semantic_class"] == {"animal": 1}
+
+
+@pytest.mark.django_db
+def test_facet_counts_are_cached(client, phrases, django_assert_num_queries):
+    language = phrases["acimosis"].language
+    url = reverse("validation:advanced_search_facets", args=[language.code])
+    cache.clear()
+
+    response = client.get(url, {"kind": "word"})
+    assert response.status_code == 200
+    assert response.json()["kind"] == {"word": 3, "sentence": 1}
+
+    with django_assert_num_queries(1):  # Just the language
+        cached = client.get(url, {"kind": "word", "page": 2})
+    assert cached.json() == response.json()
+
+
+@pytest.mark.django_db
+def test_form_lists_speakers_with_recordings(client, phrases):
+    language = phrases["acimosis"].language
+    baker.make_recipe("validation.speaker", code="SIL")
+    for speaker in Speaker.objects.all():
+        speaker.languages.add(language)
+
+    response = client.get(reverse("validation:advanced_search", args=[language.code]))
+
+    assert response.status_code == 200
+    assert 'value="MAR"' in response.content.decode("UTF-8")
+    assert 'value="SIL"' not in response.content.decode("UTF-8")
+    assert 'value="animal"' in response.content.decode("UTF-8")
+
+
+@pytest.fixture
+def phrases():
+    language = baker.make_recipe("validation.language")
+    mar = baker.make_recipe("validation.speaker", code="MAR")
+    lou = baker.make_recipe("validation.speaker", code="LOU")
+    animal = baker.make("validation.SemanticClass", classification="animal")
+
+    def phrase(
+        transcription, translation, recordings=(), semantic_source=None, **kwargs
+    ):
+        kwargs.setdefault("kind", Phrase.WORD)
+        kwargs.setdefault("status", Phrase.NEW)
+        kwargs.setdefault("validated", False)
+        kwargs.setdefault("analysis", "")
+        phrase = baker.make_recipe(
+            "validation.phrase",
+            language=language,
+            transcription=transcription,
+            translation=translation,
+            **kwargs,
+        )
+        for speaker, quality in recordings:
+            baker.make_recipe(
+                "validation.recording",
+                phrase=phrase,
+                speaker=speaker,
+                quality=quality,
+                compressed_audio="audio/mock_recording.m4a",
+            )
+        if semantic_source is not None:
+            SemanticClassAnnotation.objects.create(
+                phrase=phrase, semantic_class=animal, source=semantic_source
+            )
+        return phrase
+
+    return {
+        "acimosis": phrase(
+            "acimosis",
+            "puppy",
+            recordings=[(mar, Recording.BAD), (lou, Recording.GOOD)],
+            semantic_source=SemanticClassAnnotation.DICTIONARY,
+        ),
+        "minôs": phrase(
+            "minôs",
+            "cat",
+            status=Phrase.LINKED,
+            analysis="minôs+N+A+Sg",
+            recordings=[(mar, Recording.GOOD)],
+            semantic_source=SemanticClassAnnotation.MANUAL,
+        ),
+        "atim": phrase(
+            "atim",
+            "dog",
+            status=Phrase.LINKED,
+            validated=True,
+            analysis="atim+N+A+Sg",
+            recordings=[(lou, Recording.BAD)],
+        ),
+        "nipiy ekwa": phrase(
+            "nipiy ekwa", "water and", kind=Phrase.SENTENCE, status=Phrase.AUTO
+        ),
+    }
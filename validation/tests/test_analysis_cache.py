@@ -0,0 +1,72 @@
+"""
+Tests for the cache of FST analyses.
+"""
+
+import pytest  # type: ignore
+
+from validation.analysis_cache import AnalysisCache
+from validation.models import FSTAnalysis
+
+ANALYSES = {"acimosis": "acimosis+N+A+Sg", "nipiy": "nipiy+N+I+Sg"}
+
+
+def test_analyses_are_cached(analyzer):
+    cache = AnalysisCache(analyzer, "fst")
+
+    assert cache.analyze("acimosis") == "acimosis+N+A+Sg"
+    assert cache.analyze_many(["acimosis", "nipiy", "xyz", "nipiy"]) == {
+        "acimosis": "acimosis+N+A+Sg",
+        "nipiy": "nipiy+N+I+Sg",
+        "xyz": "",
+    }
+    assert cache.analyze("xyz") == ""
+
+    assert analyzer.calls == ["acimosis", "nipiy", "xyz"]
+    assert cache.statistics() == {
+        "hits": 2,
+        "persistent_hits": 0,
+        "misses": 3,
+        "hit_rate": 0.4,
+    }
+
+
+def test_least_recently_used_analyses_are_forgotten(analyzer):
+    cache = AnalysisCache(analyzer, "fst", max_size=2)
+
+    cache.analyze_many(["acimosis", "nipiy"])
+    cache.analyze("acimosis")
+    cache.analyze("xyz")
+    cache.analyze_many(["acimosis", "xyz", "nipiy"])
+
+    assert analyzer.calls == ["acimosis", "nipiy", "xyz", "nipiy"]
+
+
+@pytest.mark.django_db
+def test_persisted_analyses(analyzer):
+    AnalysisCache(analyzer, "fst", persistent=True).analyze_many(["acimosis", "xyz"])
+    other_process = AnalysisCache(analyzer, "fst", persistent=True)
+    other_fst = AnalysisCache(analyzer, "other fst", persistent=True)
+
+    assert other_process.analyze_many(["acimosis", "xyz"]) == {
+        "acimosis": "acimosis+N+A+Sg",
+        "xyz": "",
+    }
+    assert other_process.statistics()["persistent_hits"] == 2
+    other_fst.analyze("acimosis")
+
+    assert analyzer.calls == ["acimosis", "xyz", "acimosis"]
+    assert FSTAnalysis.objects.count() == 3
+
+
+@pytest.fixture
+def analyzer():
+    """
+    Analyzes the words in ANALYSES, and records which words it was asked for.
+    """
+
+    def lookup(wordform):
+        lookup.calls.append(wordform)
+        return ANALYSES.get(wordform, "")
+
+    lookup.calls = []
+    return lookup
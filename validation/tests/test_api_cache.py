@@ -0,0 +1,125 @@
+"""
+Tests for caching the responses of the public recordings API.
+"""
+
+import pytest  # type: ignore
+from django.shortcuts import reverse  # type: ignore
+from model_bakery import baker  # type: ignore
+
+from validation.api_cache import cache_statistics
+
+
+@pytest.mark.django_db
+def test_bulk_search_is_cached(client, recording):
+    url = reverse("validation:bulk_search_recordings", args=["maskwacis"])
+    query = {"q": [recording.phrase.transcription, "missing"], "exact": "true"}
+
+    first = client.get(url, query)
+    second = client.get(url, query)
+
+    assert first["X-Cache"] == "MISS"
+    assert second["X-Cache"] == "HIT"
+    assert second.content == first.content
+    assert second["Access-Control-Allow-Origin"] == "*"
+    assert second.json()["not_found"] == ["missing"]
+    assert cache_statistics() == {"hits": 1, "misses": 1}
+
+    # The terms are echoed in the response, so their order matters:
+    reordered = {"q": ["missing", recording.phrase.transcription], "exact": "true"}
+    assert client.get(url, reordered)["X-Cache"] == "MISS"
+    assert client.get(url, {**query, "exact": "false"})["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+def test_search_is_cached_by_fuzzy_transcription(client, recording):
+    def search(query):
+        return client.get(
+            reverse("validation:search_recordings", kwargs={"query": query})
+        )
+
+    first = search("âcimosis,nipiy")
+
+    assert first["X-Cache"] == "MISS"
+    assert len(first.json()) == 1
+    for query in ["acimosis,nipiy", "nipiy,Acimosis ", "acimosis,âcimosis,nipîy"]:
+        response = search(query)
+        assert response["X-Cache"] == "HIT"
+        assert response.content == first.content
+    assert search("acimosis")["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+def test_search_is_cached_until_a_recording_changes(
+    client, recording, django_capture_on_commit_callbacks
+):
+    url = reverse(
+        "validation:search_recordings", kwargs={"query": recording.phrase.transcription}
+    )
+
+    assert client.get(url)["X-Cache"] == "MISS"
+    assert client.get(url).json()[0]["is_best"] is False
+
+    with django_capture_on_commit_callbacks(execute=True):
+        recording.is_best = True
+        recording.save()
+        # Until the change is committed, other requests must not cache it
+        # under the new generation:
+        assert client.get(url)["X-Cache"] == "HIT"
+
+    response = client.get(url)
+    assert response["X-Cache"] == "MISS"
+    assert response.json()[0]["is_best"] is True
+
+
+@pytest.mark.django_db
+def test_changing_a_phrase_only_invalidates_its_language(
+    client, recording, django_capture_on_commit_callbacks
+):
+    other_language = baker.make_recipe(
+        "validation.language", name="Tsuut'ina", code="tsuutina"
+    )
+    url = reverse("validation:bulk_search_recordings", args=["maskwacis"])
+    query = {"q": recording.phrase.transcription, "exact": "true"}
+    client.get(url, query)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        baker.make_recipe("validation.phrase", language=other_language)
+    assert client.get(url, query)["X-Cache"] == "HIT"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        baker.make_recipe("validation.phrase", language=recording.phrase.language)
+    assert client.get(url, query)["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+def test_changing_a_speaker_invalidates_everything(
+    client, recording, django_capture_on_commit_callbacks
+):
+    url = reverse("validation:bulk_search_recordings", args=["maskwacis"])
+    query = {"q": recording.phrase.transcription, "exact": "true"}
+    client.get(url, query)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        recording.speaker.full_name = "Somebody Else"
+        recording.speaker.save()
+
+    response = client.get(url, query)
+    assert response["X-Cache"] == "MISS"
+    assert response.json()["matched_recordings"][0]["speaker_name"] == "Somebody Else"
+
+
+@pytest.fixture
+def recording():
+    language = baker.make_recipe("validation.language")
+    phrase = baker.make_recipe(
+        "validation.phrase", language=language, transcription="acimosis"
+    )
+    speaker = baker.make_recipe("validation.speaker")
+    speaker.languages.add(language)
+    return baker.make_recipe(
+        "validation.recording",
+        phrase=phrase,
+        speaker=speaker,
+        is_best=False,
+        compressed_audio="audio/mock_recording.m4a",
+    )
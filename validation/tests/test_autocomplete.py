@@ -0,0 +1,71 @@
+"""
+Tests for the transcription autocompletion endpoint.
+"""
+
+import pytest  # type: ignore
+from django.shortcuts import reverse  # type: ignore
+from model_bakery import baker  # type: ignore
+
+from validation.models import Phrase
+from validation.views import LAST_CODE_POINT, MAX_AUTOCOMPLETE_RESULTS
+
+
+@pytest.mark.django_db
+def test_autocomplete_matches_prefixes_within_the_language(client, language):
+    other_language = baker.make_recipe(
+        "validation.language", name="Tsuut'ina", code="tsuutina"
+    )
+    for transcription in ["acimosis", "acimosisak", "acimosis", "nipiy", "ê-acimosit"]:
+        baker.make_recipe(
+            "validation.phrase", transcription=transcription, language=language
+        )
+    baker.make_recipe(
+        "validation.phrase", transcription="acimostawew", language=other_language
+    )
+
+    response = client.get(autocomplete_url(language, "acim"))
+
+    assert response.status_code == 200
+    assert response.json() == ["acimosis", "acimosisak"]
+
+
+@pytest.mark.django_db
+def test_autocomplete_limits_results(client, language):
+    baker.make_recipe(
+        "validation.phrase",
+        transcription="acimosis",
+        language=language,
+        _quantity=MAX_AUTOCOMPLETE_RESULTS + 5,
+    )
+    # Make each transcription distinct:
+    for phrase in Phrase.objects.all():
+        phrase.transcription += str(phrase.id)
+        phrase.save()
+
+    response = client.get(autocomplete_url(language, "acimosis"))
+
+    assert len(response.json()) == MAX_AUTOCOMPLETE_RESULTS
+
+
+@pytest.mark.django_db
+def test_autocomplete_ignores_short_terms(client, language):
+    baker.make_recipe("validation.phrase", transcription="awas", language=language)
+
+    response = client.get(autocomplete_url(language, "aw"))
+
+    assert response.json() == []
+
+
+@pytest.mark.django_db
+def test_autocomplete_query_uses_index(language):
+    plan = Phrase.objects.filter(
+        language=language,
+        transcription__gte="acim",
+        transcription__lt="acim" + LAST_CODE_POINT,
+    ).explain()
+
+    assert "language_transcription_idx" in plan
+
+
+def autocomplete_url(language, term):
+    return reverse("validation:autocomplete", args=[language.code]) + f"?term={term}"
@@ -0,0 +1,92 @@
+"""
+Tests for the autoval command.
+"""
+
+import json
+
+import pytest  # type: ignore
+from django.core.management import call_command
+from model_bakery import baker  # type: ignore
+
+from validation.management.commands import autoval
+from validation.models import Phrase
+
+
+@pytest.mark.django_db
+def test_autoval(language, looked_up, tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    first, second = [
+        baker.make_recipe(
+            "validation.phrase",
+            language=language,
+            field_transcription="acimosis",
+            transcription="acimosis",
+        )
+        for _ in range(2)
+    ]
+    unknown = baker.make_recipe(
+        "validation.phrase", language=language, field_transcription="xyz"
+    )
+
+    call_command(
+        "autoval", "--workers", "1", "--chunk-size", "2", "--checkpoint", checkpoint
+    )
+
+    for phrase in first, second:
+        phrase.refresh_from_db()
+        assert phrase.validated
+        assert phrase.status == "auto-validated"
+        assert phrase.transcription == "acimosîs"
+        assert phrase.fuzzy_transcription == "acimosis"
+        assert phrase.analysis == "acimosis+N+A+Sg"
+        assert phrase.history.first().status == "auto-validated"
+    unknown.refresh_from_db()
+    assert not unknown.validated
+    # Once per field transcription:
+    assert looked_up == ["acimosis", "xyz"]
+    assert not checkpoint.exists()
+
+
+@pytest.mark.django_db
+def test_autoval_resumes(language, looked_up, tmp_path):
+    before, after = [
+        baker.make_recipe(
+            "validation.phrase", language=language, field_transcription="acimosis"
+        )
+        for _ in range(2)
+    ]
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"last_phrase_id": before.id}))
+
+    call_command("autoval", "--workers", "1", "--checkpoint", checkpoint)
+
+    assert Phrase.objects.get(id=before.id).validated is False
+    assert Phrase.objects.get(id=after.id).validated is True
+
+
+@pytest.fixture
+def looked_up(monkeypatch):
+    """
+    Replaces the speller and itwêwina: only "acimosis" has a suggestion.
+    Returns the list of words looked up.
+    """
+    words = []
+
+    def get_distance_with_translations(word):
+        words.append(word)
+        if word != "acimosis":
+            return {}
+        match = {"translation": "puppy", "analysis": "acimosis+N+A+Sg", "source": "CW"}
+        return {
+            "acimosîs": {
+                "transcription": "acimosîs",
+                "med": 0,
+                "matches": [match],
+                "len": 1,
+            }
+        }
+
+    monkeypatch.setattr(
+        autoval, "get_distance_with_translations", get_distance_with_translations
+    )
+    return words
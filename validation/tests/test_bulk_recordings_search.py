@@ -6,9 +6,12 @@ import urllib
 
 import pytest  # type: ignore
 from django.core.management import call_command
+from django.db import connection
 from django.shortcuts import reverse  # type: ignore
+from model_bakery import baker  # type: ignore
 
 from validation.models import Recording, Phrase, Speaker
+from validation.views import sample_recordings
 
 
 @pytest.mark.django_db
@@ -186,6 +189,58 @@ def test_search_recordings_with_macrons(client, insert_test_data):
     assert recording.get("anonymous") is False
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize("in_sql", [True, False])
+def test_sample_recordings(monkeypatch, django_assert_num_queries, in_sql):
+    """
+    Samples have the best recordings first, then the speakers take turns.
+    """
+    monkeypatch.setattr(connection.features, "supports_over_clause", in_sql)
+    phrase = baker.make_recipe("validation.phrase", transcription="nipiy")
+    other_phrase = baker.make_recipe("validation.phrase", transcription="awas")
+    chatty, quiet, best = [baker.make_recipe("validation.speaker") for _ in range(3)]
+
+    def record(speaker, count, phrase=phrase, **kwargs):
+        recordings = [
+            baker.make_recipe(
+                "validation.recording", phrase=phrase, speaker=speaker, **kwargs
+            )
+            for _ in range(count)
+        ]
+        # Each speaker's turns come in order of primary key.
+        return sorted(recordings, key=lambda recording: recording.pk)
+
+    chatty_recordings = record(chatty, 12)
+    quiet_recordings = record(quiet, 2)
+    best_recordings = record(best, 1, is_best=True) + record(best, 2)
+    other_recordings = record(quiet, 3, phrase=other_phrase)
+
+    with django_assert_num_queries(1 if in_sql else 2):
+        samples = sample_recordings(
+            {
+                "nipiy": Recording.objects.filter(phrase=phrase),
+                "awas": Recording.objects.filter(phrase=other_phrase),
+                "nothing": Recording.objects.none(),
+            }
+        )
+
+    nipiy = samples["nipiy"]
+    assert nipiy[0] == best_recordings[0]
+    assert len(nipiy) == 10
+    assert set(nipiy) == {
+        *chatty_recordings[:5],
+        *quiet_recordings,
+        *best_recordings,
+    }
+    # The best recording was the best speaker's first turn.
+    assert nipiy[1:3] == sorted(
+        [chatty_recordings[0], quiet_recordings[0]],
+        key=lambda recording: recording.speaker_id,
+    )
+    assert samples["awas"] == other_recordings
+    assert samples["nothing"] == []
+
+
 @pytest.fixture
 def insert_test_data():
     call_command(
@@ -0,0 +1,60 @@
+"""
+Tests for the bulk, history-aware writes in validation/history.py.
+"""
+
+import pytest  # type: ignore
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker  # type: ignore
+
+from validation import history
+from validation.history import bulk_delete_with_history
+from validation.models import (
+    HistoricalSemanticClassAnnotation,
+    SemanticClass,
+    SemanticClassAnnotation,
+)
+
+
+@pytest.mark.django_db
+def test_bulk_delete_with_history(monkeypatch, language):
+    monkeypatch.setattr(history, "DELETE_BATCH_SIZE", 2)
+    user = User.objects.create_user("linguist")
+    phrase = baker.make_recipe("validation.phrase", language=language)
+    annotations = [
+        SemanticClassAnnotation.objects.create(
+            phrase=phrase,
+            semantic_class=SemanticClass.objects.create(
+                collection=SemanticClass.RW, classification=f"1.6.1.1.{index} Dog"
+            ),
+        )
+        for index in range(4)
+    ]
+    kept = annotations.pop()
+    annotations[0]._change_reason = "duplicate"
+
+    with CaptureQueriesContext(connection) as context:
+        bulk_delete_with_history(
+            annotations,
+            SemanticClassAnnotation,
+            default_user=user,
+            default_change_reason="merged",
+        )
+
+    assert list(SemanticClassAnnotation.objects.all()) == [kept]
+    deletions = HistoricalSemanticClassAnnotation.objects.filter(history_type="-")
+    assert sorted(
+        deletions.values_list("id", "history_user", "history_change_reason")
+    ) == [
+        (annotations[0].id, user.id, "duplicate"),
+        (annotations[1].id, user.id, "merged"),
+        (annotations[2].id, user.id, "merged"),
+    ]
+    # One INSERT for the history, and one DELETE per batch:
+    writes = [
+        query["sql"].split()[0]
+        for query in context.captured_queries
+        if query["sql"].startswith(("INSERT", "DELETE"))
+    ]
+    assert writes == ["INSERT", "DELETE", "DELETE"]
@@ -0,0 +1,226 @@
+"""
+Tests for the itwêwina lookup client, against a local stub of itwêwina, and
+for dictionary snapshots.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest  # type: ignore
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+
+from validation import helpers
+from validation.analysis_cache import AnalysisCache
+from validation.itwewina import ItwewinaClient, SnapshotClient
+
+# How long the stub takes to answer each request, in seconds.
+LATENCY = 0.2
+
+
+def test_lookup(itwewina):
+    client = ItwewinaClient(itwewina.url)
+
+    results = client.lookup("nipiy")
+
+    assert results == {"results": [{"wordform_text": "nipiy"}]}
+    assert itwewina.requests == ["nipiy"]
+
+
+def test_lookups_are_cached(itwewina):
+    client = ItwewinaClient(itwewina.url)
+
+    client.lookup("nipiy")
+    assert client.lookup("nipiy") == {"results": [{"wordform_text": "nipiy"}]}
+    client.lookup_many(["nipiy", "atim"])
+
+    assert itwewina.requests == ["nipiy", "atim"]
+
+
+def test_lookup_many_is_concurrent(itwewina):
+    client = ItwewinaClient(itwewina.url)
+    words = ["nipiy", "atim", "awas", "maskwa", "sisip"]
+
+    start = time.perf_counter()
+    results = client.lookup_many(words)
+    elapsed = time.perf_counter() - start
+
+    assert list(results) == words
+    assert all(results[word]["results"][0]["wordform_text"] == word for word in words)
+    assert elapsed < LATENCY * len(words) / 2
+
+
+def test_failures_are_not_cached(itwewina):
+    client = ItwewinaClient(itwewina.url, timeout=(1, LATENCY / 2))
+
+    assert client.lookup("error") is None
+    assert client.lookup_many(["slow", "nipiy"])["slow"] is None
+    assert client.lookup("error") is None
+
+    assert itwewina.requests.count("error") == 2
+
+
+def test_cache_expires(itwewina):
+    now = [0.0]
+    client = ItwewinaClient(itwewina.url, cache_ttl=60, clock=lambda: now[0])
+
+    client.lookup("nipiy")
+    now[0] = 59
+    client.lookup("nipiy")
+    now[0] = 61
+    client.lookup("nipiy")
+
+    assert itwewina.requests == ["nipiy", "nipiy"]
+
+
+def test_least_recently_used_words_are_forgotten(itwewina):
+    client = ItwewinaClient(itwewina.url, max_cached_words=2)
+
+    client.lookup_many(["nipiy", "atim"])
+    client.lookup("nipiy")
+    client.lookup("awas")
+    client.lookup_many(["nipiy", "awas", "atim"])
+
+    assert sorted(itwewina.requests) == ["atim", "atim", "awas", "nipiy"]
+
+
+def test_shared_cache(itwewina):
+    shared_cache = LocMemCache("itwewina-test", {})
+    shared_cache.clear()
+
+    ItwewinaClient(itwewina.url, shared_cache=shared_cache).lookup("nipiy")
+    other_process = ItwewinaClient(itwewina.url, shared_cache=shared_cache)
+
+    assert other_process.lookup("nipiy") == {"results": [{"wordform_text": "nipiy"}]}
+    assert itwewina.requests == ["nipiy"]
+
+
+class StubItwewina(BaseHTTPRequestHandler):
+    """
+    Answers click-in-text queries with one result, the word itself. The word
+    "error" fails, and the word "slow" takes a second.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        (word,) = parse_qs(url.query)["q"]
+        self.server.requests.append(word)
+        time.sleep(1 if word == "slow" else LATENCY)
+
+        if url.path != "/click-in-text/" or word == "error":
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        body = json.dumps({"results": [{"wordform_text": word}]}).encode("UTF-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def itwewina():
+    """
+    Runs a stub of itwêwina on localhost. Its requests attribute lists the
+    words it was asked for.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubItwewina)
+    server.daemon_threads = True
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_port}/"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+IMPORTJSON = [
+    {
+        "head": "acimosis",
+        "slug": "acimosis",
+        "senses": [
+            {"definition": "puppy", "sources": ["CW"]},
+            {"definition": "small dog", "sources": ["CW", "MD"]},
+        ],
+    },
+    {"head": "acimosisak", "slug": "acimosisak", "formOf": "acimosis"},
+    {
+        "head": "atim",
+        "slug": "atim@na",
+        "senses": [{"definition": "dog", "sources": ["MD"]}],
+    },
+    {
+        "head": "atim",
+        "slug": "atim@ni",
+        "senses": [{"definition": "it is a dog", "sources": ["CW"]}],
+    },
+    {"head": "nothing", "slug": "nothing", "formOf": "missing"},
+]
+
+
+def test_dictionary_snapshot(tmp_path):
+    path = tmp_path / "snapshot.sqlite3"
+    call_command("makedictionarysnapshot", write_importjson(tmp_path), output=path)
+    client = SnapshotClient(path)
+
+    results = client.lookup_many(["acimosisak", "atim", "nothing"])
+
+    assert results["acimosisak"] == {
+        "results": [
+            {
+                "wordform_text": "acimosisak",
+                "lemma_wordform": {
+                    "text": "acimosis",
+                    "definitions": [
+                        {"text": "puppy", "source_ids": ["CW"]},
+                        {"text": "small dog", "source_ids": ["CW", "MD"]},
+                    ],
+                },
+            }
+        ]
+    }
+    assert [
+        result["lemma_wordform"]["definitions"][0]["text"]
+        for result in results["atim"]["results"]
+    ] == ["dog", "it is a dog"]
+    assert results["nothing"] == {"results": []}
+
+
+@pytest.mark.django_db
+def test_translations_from_snapshot(tmp_path, settings, monkeypatch):
+    settings.ITWEWINA_SNAPSHOT = tmp_path / "snapshot.sqlite3"
+    call_command(
+        "makedictionarysnapshot",
+        write_importjson(tmp_path),
+        output=settings.ITWEWINA_SNAPSHOT,
+    )
+    monkeypatch.setattr("validation.itwewina._client", None)
+    # Don't load the analyzer:
+    monkeypatch.setattr(
+        helpers, "_analysis_cache", AnalysisCache(lambda wordform: "", "fst")
+    )
+
+    translations = helpers.get_translations(
+        helpers.get_translations_from_itwewina("acimosisak")
+    )
+
+    assert [translation["translation"] for translation in translations] == [
+        "puppy",
+        "small dog",
+    ]
+    assert translations[1]["source"] == "CW, MD"
+
+
+def write_importjson(directory):
+    path = directory / "importjson.json"
+    path.write_text(json.dumps(IMPORTJSON))
+    return path
@@ -0,0 +1,122 @@
+"""
+Tests for merging phrases (handle_merge_phrases).
+"""
+
+import pytest  # type: ignore
+from django.contrib.auth.models import User
+from django.db import connection
+from django.shortcuts import reverse  # type: ignore
+from django.test.utils import CaptureQueriesContext
+
+from validation.models import (
+    Phrase,
+    Recording,
+    SemanticClass,
+    SemanticClassAnnotation,
+    SemanticClassOldAnnotation,
+)
+from validation.views import handle_merge_phrases
+
+
+@pytest.mark.django_db
+def test_deep_merge(language, make_phrases):
+    destination, first, second = make_phrases(language, 3, recordings_per_phrase=2)
+    destination.comment = "from the dictionary"
+    destination.save()
+    first.comment = "heard in a story"
+    first.display_order = -1
+    first.save()
+    dog, puppy, animal = [
+        SemanticClass.objects.create(collection=SemanticClass.RW, classification=name)
+        for name in ("dog", "puppy", "animal")
+    ]
+    annotate(destination, dog)
+    annotate(first, dog, "dictionary")
+    annotate(first, puppy, "dictionary")
+    annotate(second, puppy, "manual classification")
+    annotate(second, animal, "elicitation sheet")
+    old_class = SemanticClassOldAnnotation.objects.create(classification="dog")
+    second.semantic_class.add(old_class)
+
+    moved = list(Recording.objects.filter(phrase__in=[first, second]))
+
+    handle_merge_phrases(
+        destination, Phrase.objects.filter(id__in=[first.id, second.id]), True
+    )
+
+    assert list(Phrase.objects.all()) == [destination]
+    destination.refresh_from_db()
+    assert destination.recording_set.count() == 6
+    assert destination.comment == "from the dictionary | heard in a story"
+    assert destination.translation == "dog"
+    assert destination.display_order == -1
+    assert list(destination.semantic_class.all()) == [old_class]
+    assert sorted(
+        destination.semanticclassannotation_set.values_list(
+            "semantic_class__classification", "source"
+        )
+    ) == [
+        ("animal", "elicitation sheet"),
+        ("dog", ""),
+        ("puppy", "dictionary"),
+    ]
+
+    for recording in moved:
+        assert recording.history.first().phrase_id == destination.id
+        assert recording.history.first().history_type == "~"
+
+
+@pytest.mark.django_db
+def test_shallow_merge(language, make_phrases):
+    destination, source = make_phrases(language, 2, recordings_per_phrase=1)
+    source.comment = "heard in a story"
+    source.save()
+    annotate(source, SemanticClass.objects.create(collection=SemanticClass.RW))
+
+    handle_merge_phrases(
+        destination, Phrase.objects.filter(id__in=[destination.id, source.id]), False
+    )
+
+    destination.refresh_from_db()
+    assert list(Phrase.objects.all()) == [destination]
+    assert destination.recording_set.count() == 2
+    assert destination.comment is None
+    assert not SemanticClassAnnotation.objects.exists()
+
+
+@pytest.mark.django_db
+def test_merging_takes_a_fixed_number_of_queries(language, make_phrases):
+    def count_queries(recordings_per_phrase):
+        destination, *sources = make_phrases(language, 3, recordings_per_phrase)
+        with CaptureQueriesContext(connection) as context:
+            handle_merge_phrases(
+                destination,
+                Phrase.objects.filter(id__in=[source.id for source in sources]),
+                True,
+            )
+        return len(context.captured_queries)
+
+    assert count_queries(1) == count_queries(5)
+
+
+@pytest.mark.django_db
+def test_auto_merge_merges_every_selected_phrase(client, language, make_phrases):
+    phrases = make_phrases(language, 3, recordings_per_phrase=1)
+    client.force_login(User.objects.create_superuser("manager"))
+
+    # Listed in another order than the one the view picks the destination in:
+    response = client.get(
+        reverse("validation:merge-delete", args=[language.code]),
+        {"merge-selected": [phrase.id for phrase in reversed(phrases)]},
+    )
+
+    assert response.status_code == 302
+    (merged,) = Phrase.objects.all()
+    assert merged in phrases
+    assert merged.recording_set.count() == 3
+
+
+def annotate(phrase, semantic_class, source=""):
+    SemanticClassAnnotation.objects.create(
+        phrase=phrase, semantic_class=semantic_class, source=source
+    )
@@ -153,6 +153,38 @@ def test_speaker_validation():
         speaker.clean()
 
 
+@pytest.mark.django_db
+def test_speaker_languages(django_assert_num_queries):
+    """
+    A speaker's languages are listed oldest first, from the prefetched
+    languages if there are any.
+    """
+    maskwacis = baker.make_recipe("validation.language")
+    tsuutina = baker.make_recipe(
+        "validation.language", name="Tsuut'ina", code="tsuutina"
+    )
+    speaker = baker.make_recipe("validation.speaker")
+    speaker.languages.add(tsuutina, maskwacis)
+    silent = baker.make_recipe("validation.speaker")
+
+    with django_assert_num_queries(1):
+        assert speaker.language == [maskwacis.name, "Tsuut'ina"]
+    with django_assert_num_queries(1):
+        assert speaker.get_absolute_url().endswith(
+            f"/maskwacis/speakers/{speaker.code}"
+        )
+    assert silent.language == []
+    assert (
+        silent.get_absolute_url() == "https://speech-db.altlab.app/maskwacis/speakers/"
+    )
+
+    speakers = Speaker.objects.prefetch_related("languages").order_by("code")
+    with django_assert_num_queries(2):
+        for each in speakers:
+            each.language
+            each.get_absolute_url()
+
+
 def test_phrase():
     """
     Test that we can create a phrase instance.
@@ -0,0 +1,139 @@
+"""
+Tests for the pages that render lists of phrase cards (entries, search).
+"""
+
+import pytest  # type: ignore
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.shortcuts import reverse  # type: ignore
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker  # type: ignore
+
+PHRASES_PER_PAGE = 5
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "view_name", ["validation:entries", "validation:search_phrases"]
+)
+def test_phrase_cards_use_a_fixed_number_of_queries(
+    client, linguist, make_flagged_phrases, view_name
+):
+    """
+    Rendering a page of cards should not issue queries per phrase or per recording.
+    """
+    language = baker.make_recipe("validation.language")
+    client.force_login(linguist)
+    url = reverse(view_name, args=[language.code]) + "?query=a"
+
+    make_flagged_phrases(language, quantity=1, recordings_per_phrase=1)
+    with CaptureQueriesContext(connection) as sparse_page:
+        response = client.get(url)
+    assert response.status_code == 200
+
+    make_flagged_phrases(language, quantity=PHRASES_PER_PAGE, recordings_per_phrase=4)
+    with CaptureQueriesContext(connection) as full_page:
+        response = client.get(url)
+    assert response.status_code == 200
+
+    assert len(full_page) == len(sparse_page)
+
+
+@pytest.mark.django_db
+def test_phrase_cards_hide_recordings_by_dar(client, linguist):
+    language = baker.make_recipe("validation.language")
+    client.force_login(linguist)
+    phrase = baker.make_recipe(
+        "validation.phrase", language=language, transcription="acimosis"
+    )
+    dar = baker.make_recipe("validation.speaker", code="DAR")
+    hidden = make_recording(phrase=phrase, speaker=dar)
+    shown = make_recording(phrase=phrase)
+
+    response = client.get(reverse("validation:entries", args=[language.code]))
+
+    assert response.status_code == 200
+    assert shown.id in response.content.decode("UTF-8")
+    assert hidden.id not in response.content.decode("UTF-8")
+
+
+@pytest.mark.django_db
+def test_advanced_search_only_fetches_the_current_page(
+    client, linguist, make_flagged_phrases
+):
+    language = baker.make_recipe("validation.language")
+    speaker = baker.make_recipe("validation.speaker")
+    client.force_login(linguist)
+    url = reverse("validation:advanced_search_results", args=[language.code])
+    query = {"transcription": "a", "status": "all", "speaker-options": speaker.code}
+
+    make_flagged_phrases(language, quantity=1, recordings_per_phrase=1, speaker=speaker)
+    with CaptureQueriesContext(connection) as sparse_page:
+        response = client.get(url, query)
+    assert response.status_code == 200
+
+    make_flagged_phrases(
+        language,
+        quantity=4 * PHRASES_PER_PAGE,
+        recordings_per_phrase=4,
+        speaker=speaker,
+    )
+    with CaptureQueriesContext(connection) as many_pages:
+        response = client.get(url, query)
+    assert response.status_code == 200
+
+    assert len(many_pages) == len(sparse_page)
+
+
+@pytest.mark.django_db
+def test_advanced_search_only_shows_recordings_by_the_chosen_speakers(client, linguist):
+    language = baker.make_recipe("validation.language")
+    client.force_login(linguist)
+    phrase = baker.make_recipe(
+        "validation.phrase", language=language, transcription="acimosis"
+    )
+    chosen = make_recording(phrase=phrase)
+    other = make_recording(phrase=phrase)
+
+    response = client.get(
+        reverse("validation:advanced_search_results", args=[language.code]),
+        {"transcription": "acimosis", "speaker-options": chosen.speaker.code},
+    )
+
+    assert response.status_code == 200
+    assert chosen.id in response.content.decode("UTF-8")
+    assert other.id not in response.content.decode("UTF-8")
+
+
+def make_recording(**kwargs):
+    return baker.make_recipe(
+        "validation.recording", compressed_audio="audio/mock_recording.m4a", **kwargs
+    )
+
+
+@pytest.fixture
+def make_flagged_phrases(make_phrases):
+    """
+    make_phrases, with issues that linguists get to see on every recording.
+    """
+
+    def make_flagged_phrases(language, quantity, recordings_per_phrase, **kwargs):
+        return make_phrases(
+            language,
+            quantity,
+            recordings_per_phrase,
+            issues_per_recording=2,
+            wrong_word=True,
+            **kwargs,
+        )
+
+    return make_flagged_phrases
+
+
+@pytest.fixture
+def linguist():
+    user = baker.make(User, username="linguist")
+    for group_name in ("Linguist", "maskwacis"):
+        group, _ = Group.objects.get_or_create(name=group_name)
+        group.user_set.add(user)
+    return user
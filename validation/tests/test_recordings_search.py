@@ -24,7 +24,9 @@ from pathlib import Path
 
 import pytest  # type: ignore
 from django.core.files.base import ContentFile
+from django.db import connection
 from django.shortcuts import reverse  # type: ignore
+from django.test.utils import CaptureQueriesContext
 from model_bakery import baker  # type: ignore
 
 from validation.models import Recording
@@ -137,6 +139,20 @@ def test_search_recording_not_found(client, bake_recording):
     assert response.status_code == 404
 
 
+@pytest.mark.django_db
+def test_search_recording_with_a_misspelling(client, bake_recording):
+    recording = bake_recording(
+        phrase=baker.make_recipe("validation.phrase", transcription="mihkwâw")
+    )
+    url = reverse("validation:search_recordings", kwargs={"query": "mikwaw"})
+
+    assert client.get(url).status_code == 404
+
+    response = client.get(url, {"fuzzy": "true"})
+    assert response.status_code == 200
+    assert [r["wordform"] for r in response.json()] == ["mihkwâw"]
+
+
 @pytest.mark.django_db
 def test_search_max_queries(client, bake_recording):
     # Create valid recordings, one per phrase, but make too many of them.
@@ -280,6 +296,56 @@ def test_does_not_return_bad_recordings(client, bake_recording):
         assert recording.get("speaker") != bad_speaker.code
 
 
+@pytest.mark.django_db
+def test_search_resolves_speakers_once(
+    client, rf, bake_recording, django_capture_on_commit_callbacks
+):
+    """
+    The speakers' languages are looked up once per response, not once per
+    recording, without changing what is returned.
+    """
+    maskwacis = baker.make_recipe("validation.language")
+    tsuutina = baker.make_recipe(
+        "validation.language", name="Tsuut'ina", code="tsuutina"
+    )
+    phrase = baker.make_recipe("validation.phrase", transcription="enipat")
+    url = reverse("validation:search_recordings", kwargs={"query": "ê-nipat"})
+
+    def add_recordings(languages_of_speakers):
+        # Run the cache invalidation, so that the search is not served from
+        # the cache.
+        with django_capture_on_commit_callbacks(execute=True):
+            for languages in languages_of_speakers:
+                speaker = baker.make_recipe("validation.speaker")
+                speaker.languages.add(*languages)
+                bake_recording(phrase=phrase, speaker=speaker)
+
+    add_recordings([(), (tsuutina,)])
+    with CaptureQueriesContext(connection) as few_recordings:
+        response = client.get(url)
+    assert len(response.json()) == 2
+
+    add_recordings([(), (tsuutina,), (tsuutina, maskwacis), (maskwacis,)] * 2)
+    with CaptureQueriesContext(connection) as many_recordings:
+        response = client.get(url)
+    assert len(response.json()) == 10
+
+    assert len(many_recordings) == len(few_recordings)
+
+    request = rf.get(url)
+    expected = [
+        recording.as_json(request)
+        for recording in Recording.objects.filter(phrase=phrase)
+    ]
+    assert response.json() == expected
+    assert {tuple(r["language"]) for r in expected} == {
+        (),
+        ("Tsuut'ina",),
+        (maskwacis.name,),
+        (maskwacis.name, "Tsuut'ina"),
+    }
+
+
 @pytest.fixture
 def bake_recording(tmpdir, settings):
     """
@@ -0,0 +1,176 @@
+"""
+Tests for the full-text search over phrases.
+"""
+
+import pytest  # type: ignore
+from django.contrib.auth.models import User
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.shortcuts import reverse  # type: ignore
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker  # type: ignore
+
+from validation import search
+from validation.models import Phrase
+from validation.search import (
+    close_transcriptions,
+    order_by_relevance,
+    phrase_search_terms,
+    text_matches,
+)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        # Substrings of the transcription
+        ("acimo", {"acimosis", "acimosisak"}),
+        # Too short for the trigram index: falls back to LIKE.
+        ("ak", {"acimosisak"}),
+        # Fuzzy transcription
+        ("âcimosis", {"acimosis", "acimosisak"}),
+        # Words of the translation
+        ("puppies", {"acimosisak"}),
+        ("pup", {"acimosis", "acimosisak"}),
+        ("water and", {"nipiy ekwa"}),
+    ],
+)
+def test_text_matches(query, expected):
+    make_phrase("acimosis", "puppy")
+    make_phrase("acimosisak", "puppies")
+    make_phrase("nipiy ekwa", "water and")
+
+    matches = Phrase.objects.filter(text_matches(phrase_search_terms(query)))
+
+    assert {phrase.transcription for phrase in matches} == expected
+
+
+@pytest.mark.django_db
+def test_index_follows_updates_and_deletes():
+    phrase = make_phrase("acimosis", "puppy")
+    terms = phrase_search_terms("minôs")
+
+    assert not Phrase.objects.filter(text_matches(terms)).exists()
+    phrase.transcription = "minôs"
+    phrase.translation = "cat"
+    phrase.save()
+    assert Phrase.objects.filter(text_matches(terms)).get() == phrase
+
+    Phrase.objects.filter(id=phrase.id).update(translation="kitten")
+    assert Phrase.objects.filter(text_matches({"translation": "kitten"})).exists()
+    assert not Phrase.objects.filter(text_matches({"translation": "cat"})).exists()
+
+    phrase.delete()
+    assert not Phrase.objects.filter(text_matches(terms)).exists()
+
+
+@pytest.mark.django_db
+def test_order_by_relevance():
+    make_phrase("acimosis ekwa minôs ekwa atim", "puppy and cat and dog")
+    make_phrase("acimosis", "puppy")
+
+    terms = phrase_search_terms("acimosis")
+    matches = order_by_relevance(Phrase.objects.filter(text_matches(terms)), terms)
+
+    assert [phrase.transcription for phrase in matches] == [
+        "acimosis",
+        "acimosis ekwa minôs ekwa atim",
+    ]
+
+
+@pytest.mark.django_db
+def test_search_page_uses_the_index(client):
+    language = baker.make_recipe("validation.language")
+    client.force_login(baker.make(User))
+    make_phrase("acimosis", "puppy", language=language)
+
+    url = reverse("validation:search_phrases", args=[language.code])
+    response = client.get(url, {"query": "puppy"})
+
+    assert response.status_code == 200
+    assert "acimosis" in response.content.decode("UTF-8")
+
+
+@pytest.mark.django_db
+def test_close_transcriptions():
+    mihkwaw = make_phrase("mihkwâw", "it is red")
+    mihko = make_phrase("mihko", "blood")
+    make_phrase("miskwamiy", "ice")
+
+    # One letter off, and an aspiration that costs nothing.
+    assert close_transcriptions("mihkwaw") == {mihkwaw.id: 0.0}
+    assert close_transcriptions("mikwâw") == {mihkwaw.id: 0.0}
+    assert close_transcriptions("mihkwâs") == {mihkwaw.id: 1.0}
+    assert close_transcriptions("mihkos") == {mihko.id: 1.0}
+    assert close_transcriptions("mi") == {}
+
+
+@pytest.mark.django_db
+def test_close_transcriptions_of_a_language():
+    language = baker.make_recipe("validation.language")
+    mihkwaw = make_phrase("mihkwâw", "it is red", language=language)
+    make_phrase("mihkwâw", "it is red")
+
+    assert close_transcriptions("mihkwâs", language) == {mihkwaw.id: 1.0}
+
+
+@pytest.mark.django_db
+def test_search_page_shows_close_matches(client):
+    language = baker.make_recipe("validation.language")
+    client.force_login(baker.make(User))
+    make_phrase("mihkwâw", "it is red", language=language)
+
+    url = reverse("validation:search_phrases", args=[language.code])
+    response = client.get(url, {"query": "mihkwâs"})
+
+    assert response.status_code == 200
+    assert "mihkwâw" in response.content.decode("UTF-8")
+    assert "closest spellings" in response.content.decode("UTF-8")
+
+
+@pytest.mark.django_db
+def test_other_databases_fall_back_to_like(monkeypatch):
+    monkeypatch.setattr(search, "is_search_index_supported", lambda conn=None: False)
+    make_phrase("acimosisak", "puppies")
+    make_phrase("acimosis", "puppy")
+    make_phrase("nipiy", "water")
+
+    terms = phrase_search_terms("acimosis")
+    with CaptureQueriesContext(connection) as context:
+        matches = list(
+            order_by_relevance(Phrase.objects.filter(text_matches(terms)), terms)
+        )
+
+    assert [phrase.transcription for phrase in matches] == ["acimosis", "acimosisak"]
+    assert "MATCH" not in context.captured_queries[0]["sql"]
+    assert close_transcriptions("acimosis") == {}
+
+
+@pytest.mark.django_db
+def test_migrating_repairs_dropped_triggers():
+    phrase = make_phrase("acimosis", "puppy")
+    # What Django does to the triggers when a migration alters validation_phrase:
+    with connection.cursor() as cursor:
+        for trigger in search.TRIGGERS:
+            cursor.execute(f"DROP TRIGGER {trigger}")
+    Phrase.objects.filter(id=phrase.id).update(translation="kitten")
+    assert not Phrase.objects.filter(text_matches({"translation": "kitten"})).exists()
+
+    emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
+
+    assert (
+        Phrase.objects.filter(text_matches({"translation": "kitten"})).get() == phrase
+    )
+    Phrase.objects.filter(id=phrase.id).update(translation="cat")
+    assert Phrase.objects.filter(text_matches({"translation": "cat"})).get() == phrase
+
+
+def make_phrase(transcription, translation, **kwargs):
+    return baker.make_recipe(
+        "validation.phrase",
+        transcription=transcription,
+        translation=translation,
+        status=Phrase.NEW,
+        **kwargs,
+    )
@@ -0,0 +1,88 @@
+"""
+Tests for saving the segment page (segment_content_view's POST).
+"""
+
+import pytest  # type: ignore
+from django.contrib.auth.models import User
+from django.db import connection
+from django.shortcuts import reverse  # type: ignore
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker  # type: ignore
+
+from validation.models import (
+    HistoricalSemanticClassAnnotation,
+    SemanticClass,
+    SemanticClassAnnotation,
+)
+
+
+@pytest.mark.django_db
+def test_save_rapidwords(client):
+    user = User.objects.create_user("linguist")
+    client.force_login(user)
+    client.cookies["suggestions"] = "off"
+    language = baker.make_recipe("validation.language")
+    phrase = baker.make_recipe(
+        "validation.phrase", language=language, transcription="acimosis"
+    )
+    rapidwords = [
+        SemanticClass.objects.create(
+            collection=SemanticClass.RW, classification=f"1.6.1.1.{index} Dog"
+        )
+        for index in range(5)
+    ]
+    removed, kept, added = rapidwords[:2], rapidwords[2:3], rapidwords[3:]
+    wordnet = SemanticClass.objects.create(
+        collection=SemanticClass.WN, classification="(n) dog"
+    )
+    for semantic_class in [*removed, *kept, wordnet]:
+        SemanticClassAnnotation.objects.create(
+            phrase=phrase, semantic_class=semantic_class, source="dictionary"
+        )
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(
+            reverse("validation:segment_detail", args=[language.code, phrase.id]),
+            {
+                "translation": "puppy",
+                "rapidwords": [semantic_class.id for semantic_class in kept + added],
+            },
+        )
+
+    assert response.status_code == 200
+    phrase.refresh_from_db()
+    assert phrase.translation == "puppy"
+    assert phrase.validated
+    assert {
+        annotation.semantic_class
+        for annotation in phrase.semanticclassannotation_set.all()
+    } == {*kept, *added, wordnet}
+    assert {
+        annotation.source
+        for annotation in phrase.semanticclassannotation_set.filter(
+            semantic_class__in=added
+        )
+    } == {SemanticClassAnnotation.MANUAL}
+
+    changes = HistoricalSemanticClassAnnotation.objects.filter(
+        history_user=user
+    ).values_list("history_type", "semantic_class_id")
+    assert sorted(changes) == sorted(
+        [("+", semantic_class.id) for semantic_class in added]
+        + [("-", semantic_class.id) for semantic_class in removed]
+    )
+
+    # Each write is done once, not once per annotation:
+    writes = [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith(("INSERT", "DELETE"))
+    ]
+    assert (
+        sum(
+            "validation_semanticclassannotation" in sql and "historical" not in sql
+            for sql in writes
+        )
+        == 2
+    )
+    assert sum("historicalsemanticclassannotation" in sql for sql in writes) == 2
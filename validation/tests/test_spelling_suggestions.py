@@ -0,0 +1,192 @@
+"""
+Tests for spelling suggestions: their ranking (see RULES FOR MED in
+helpers.py), and their precomputation.
+"""
+
+import pytest  # type: ignore
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.shortcuts import reverse  # type: ignore
+from model_bakery import baker  # type: ignore
+
+from validation import helpers
+from validation.management.commands import precomputesuggestions
+from validation.models import PrecomputedSuggestions
+
+SUGGESTIONS = {
+    "acimosîs": {
+        "transcription": "acimosîs",
+        "med": 0.0,
+        "matches": [
+            {"translation": "puppy", "analysis": "acimosis+N+A+Sg", "source": "CW"}
+        ],
+        "len": 1,
+    }
+}
+
+
+@pytest.mark.parametrize(
+    "word,suggestion,med",
+    [
+        # Rankings that the difflib-based distance got right, and still holds:
+        ("acimosis", "acimosis", 0),
+        ("wapos", "wâpos", 0),
+        ("pimatisiwin", "pimâtisiwin", 0),
+        ("mikwaw", "mihkwâw", 0),
+        ("nitawi-nipa", "nitawinipâ", 0),
+        ("tansi", "tânisi", 0.5),
+        ("tanisi", "tansi", 0.5),
+        ("maskwa", "maskwak", 1),
+        ("miywasin", "miwasin", 1),
+        ("acimosis", "acimosisak", 2),
+        # Substituting a character is one edit, not a deletion and an insertion:
+        ("nipiy", "nipit", 1),
+        # Diacritics, hyphens and glides are free wherever they are:
+        ("e-nipat", "ênipat", 0),
+        ("kiya", "kîwa", 0),
+        # The distance is a true minimum:
+        ("awas", "awâsis", 1.5),
+        # e -> ê is free, but "we should never replace ê with e":
+        ("nipet", "nipêt", 0),
+        ("meskanaw", "mêskanaw", 0),
+        ("nipêt", "nipet", 1),
+        ("mêskanaw", "meskanaw", 1),
+    ],
+)
+def test_minimum_edit_distance(word, suggestion, med):
+    assert helpers.rank_suggestions(word, [suggestion]) == {suggestion: med}
+
+
+def test_e_never_replaces_e_circumflex():
+    # Golden rankings from the difflib-based distance.
+    assert list(helpers.rank_suggestions("mêskanaw", ["meskanaw", "mêskanaw"])) == [
+        "mêskanaw",
+        "meskanaw",
+    ]
+    assert list(helpers.rank_suggestions("nipet", ["nipit", "nipêt"])) == [
+        "nipêt",
+        "nipit",
+    ]
+
+
+def test_suggestions_are_ranked(monkeypatch):
+    class Speller:
+        def suggest(self, word):
+            return [("nipit", 1.0), ("nipiyak", 2.0), (), ("nîpiy", 3.0)]
+
+    monkeypatch.setattr(helpers, "_speller", Speller())
+
+    assert helpers.get_edit_distance("nipiy") == {
+        "nîpiy": 0,
+        "nipit": 1,
+        "nipiyak": 2,
+    }
+
+
+@pytest.mark.django_db
+def test_segment_page_shows_precomputed_suggestions(client, computed):
+    language = baker.make_recipe("validation.language")
+    phrase = baker.make_recipe(
+        "validation.phrase", language=language, field_transcription="acimosis"
+    )
+    helpers.store_suggestions({"acimosis": SUGGESTIONS})
+    client.force_login(User.objects.create_user("linguist"))
+
+    response = client.get(
+        reverse("validation:segment_detail", args=[language.code, phrase.id])
+    )
+
+    assert response.status_code == 200
+    assert "acimosis+N+A+Sg" in response.content.decode("UTF-8")
+    assert computed == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("complete", [True, False])
+def test_missing_suggestions_are_computed(computed, complete):
+    computed.complete = complete
+
+    assert helpers.get_precomputed_suggestions("acimosis") == SUGGESTIONS
+    helpers.get_precomputed_suggestions("acimosis")
+
+    # Unless itwêwina could not be reached, they are only computed once:
+    assert computed == ["acimosis"] * (1 if complete else 2)
+
+
+@pytest.mark.django_db
+def test_precompute_suggestions(computed):
+    baker.make_recipe("validation.phrase", field_transcription="acimosis")
+    baker.make_recipe("validation.phrase", field_transcription="", transcription="atim")
+    baker.make_recipe("validation.phrase", field_transcription="nipiy", validated=True)
+    helpers.store_suggestions({"atim": {}})
+
+    call_command("precomputesuggestions", "--workers", "1")
+    assert computed == ["acimosis"]
+
+    call_command("precomputesuggestions", "--workers", "1", "--refresh")
+    assert sorted(computed) == ["acimosis", "acimosis", "atim"]
+    assert PrecomputedSuggestions.objects.get(transcription="atim").suggestions == (
+        SUGGESTIONS
+    )
+
+
+@pytest.mark.django_db
+def test_changed_transcriptions_are_queued(computed):
+    phrase = baker.make_recipe("validation.phrase", field_transcription="acimosis")
+    baker.make_recipe("validation.phrase", field_transcription="atim")
+    call_command("precomputesuggestions", "--workers", "1")
+    assert sorted(computed) == ["acimosis", "atim"]
+
+    phrase.field_transcription = "acimosisak"
+    phrase.save()
+    assert (
+        PrecomputedSuggestions.objects.get(transcription="acimosisak").computed_on
+        is None
+    )
+
+    call_command("precomputesuggestions", "--workers", "1", "--stale-only")
+    assert sorted(computed) == ["acimosis", "acimosisak", "atim"]
+    # No unvalidated phrase displays the suggestions for "acimosis" anymore:
+    assert sorted(
+        PrecomputedSuggestions.objects.values_list("transcription", flat=True)
+    ) == ["acimosisak", "atim"]
+
+
+@pytest.mark.django_db
+def test_queued_suggestions_are_computed_on_the_segment_page(client, computed):
+    language = baker.make_recipe("validation.language")
+    phrase = baker.make_recipe(
+        "validation.phrase", language=language, field_transcription="acimosis"
+    )
+    client.force_login(User.objects.create_user("linguist"))
+
+    response = client.get(
+        reverse("validation:segment_detail", args=[language.code, phrase.id])
+    )
+
+    assert "acimosis+N+A+Sg" in response.content.decode("UTF-8")
+    assert computed == ["acimosis"]
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    """
+    Replaces the speller and itwêwina: every word has SUGGESTIONS. Returns the
+    list of words whose suggestions were computed; set its complete attribute
+    to pretend itwêwina could not be reached.
+    """
+
+    class Computed(list):
+        complete = True
+
+    words = Computed()
+
+    def suggestions_with_translations(word):
+        words.append(word)
+        return SUGGESTIONS, words.complete
+
+    for module in helpers, precomputesuggestions:
+        monkeypatch.setattr(
+            module, "suggestions_with_translations", suggestions_with_translations
+        )
+    return words
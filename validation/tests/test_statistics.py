@@ -0,0 +1,162 @@
+"""
+Tests for the language statistics and their precomputed snapshots.
+"""
+
+import pytest  # type: ignore
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.shortcuts import reverse  # type: ignore
+from model_bakery import baker  # type: ignore
+
+from validation.models import Phrase, Recording, StatisticsSnapshot
+from validation.statistics import collect_statistics, refresh_statistics_snapshot
+
+
+@pytest.mark.django_db
+def test_saving_a_phrase_marks_its_language_stale(language):
+    other_language = baker.make_recipe(
+        "validation.language", name="Tsuut'ina", code="tsuutina"
+    )
+    snapshot = refresh_statistics_snapshot(language)
+    other_snapshot = refresh_statistics_snapshot(other_language)
+    assert snapshot.statistics["Number of entries (words/phrases)"] == 0
+
+    baker.make_recipe("validation.phrase", language=language)
+
+    snapshot.refresh_from_db()
+    other_snapshot.refresh_from_db()
+    assert snapshot.is_stale
+    assert not other_snapshot.is_stale
+
+
+@pytest.mark.django_db
+def test_refresh_only_stale_snapshots(language):
+    baker.make_recipe("validation.phrase", language=language)
+    never_computed = baker.make_recipe(
+        "validation.language", name="Tsuut'ina", code="tsuutina"
+    )
+
+    call_command("refreshstatistics", "--stale-only")
+
+    snapshot = StatisticsSnapshot.objects.get(language=language)
+    assert not snapshot.is_stale
+    assert snapshot.statistics["Number of entries (words/phrases)"] == 1
+    assert StatisticsSnapshot.objects.filter(language=never_computed).exists()
+
+    computed_on = snapshot.computed_on
+    call_command("refreshstatistics", "--stale-only")
+    snapshot.refresh_from_db()
+    assert snapshot.computed_on == computed_on
+
+
+@pytest.mark.django_db
+def test_statistics_page_renders_the_snapshot(client, language):
+    client.force_login(baker.make(User))
+    snapshot = refresh_statistics_snapshot(language)
+    snapshot.statistics = {"Number of unicorns": 42}
+    snapshot.save()
+
+    response = client.get(reverse("validation:statistics", args=[language.code]))
+
+    assert response.status_code == 200
+    assert "Number of unicorns" in response.content.decode("UTF-8")
+
+
+@pytest.mark.django_db
+def test_collect_statistics(language, django_assert_max_num_queries):
+    make_varied_entries(language)
+
+    with django_assert_max_num_queries(4):
+        statistics = collect_statistics(language)
+
+    assert statistics == {
+        "Number of entries (words/phrases)": 6,
+        "Number of distinct transcriptions": 5,
+        "Total distinct words (including as part of sentences)": 7,
+        "Number of entries touched by a human in speech-db": 2,
+        "Number of entries with an empty linguistic analysis": 3,
+        "Number of entries with a green heading": 2,
+        "Number of entries with a red heading": 1,
+        "Number of entries with a grey heading": 3,
+        "Number of entries with an origin different than new word": 2,
+        "Number of entries manually marked good": 1,
+        "Number of entries manually marked needs review": 1,
+        "Number of entries where the 'I don't know' button appears marked": 2,
+        "Number of transcriptions with 1 word": 3,
+        "Number of transcriptions with 2 words": 1,
+        "Number of transcriptions with 3 words": 1,
+        "Total recordings": 8,
+        "Total recordings without declared issues": 5,
+        "Total recordings marked good quality": 3,
+        "Total recordings marked bad quality": 1,
+        "Total recordings marked unknown quality": 2,
+        "Total recordings marked best": 2,
+        "Total recordings touched by a human": 4,
+        "Total phrases where all recordings have been touched by a human in speech-db": 3,
+        "Total phrases where some recordings have been touched by a human in speech-db": 3,
+        "Total phrases where no recordings have been touched by a human in speech-db": 3,
+    }
+
+
+def make_varied_entries(language):
+    """
+    Makes phrases and recordings in every state counted by the statistics.
+    """
+    human = baker.make(User)
+    other_language = baker.make_recipe(
+        "validation.language", name="Tsuut'ina", code="tsuutina"
+    )
+
+    def phrase(transcription, **kwargs):
+        kwargs.setdefault("language", language)
+        kwargs.setdefault("analysis", "")
+        kwargs.setdefault("validated", False)
+        kwargs.setdefault("status", Phrase.NEW)
+        kwargs.setdefault("origin", Phrase.NEW_WORD)
+        return baker.make_recipe(
+            "validation.phrase", transcription=transcription, **kwargs
+        )
+
+    def recording(phrase, touched=False, **kwargs):
+        rec = baker.make_recipe(
+            "validation.recording",
+            phrase=phrase,
+            compressed_audio="audio/mock_recording.m4a",
+            **kwargs,
+        )
+        if touched:
+            touch(rec)
+        return rec
+
+    def touch(instance):
+        instance._history_user = human
+        instance.save()
+
+    acimosis = phrase(
+        "acimosis", validated=True, status=Phrase.LINKED, analysis="acimosis+N+A+Sg"
+    )
+    touch(acimosis)
+    recording(acimosis, touched=True, quality=Recording.GOOD)
+    recording(acimosis, quality=Recording.BAD, wrong_word=True)
+
+    duplicate = phrase("acimosis", status=Phrase.REVIEW)
+    recording(duplicate, touched=True, quality=Recording.UNKNOWN)
+
+    sentence = phrase("nipiy ekwa", origin=Phrase.MASKWACÎS_DICTIONARY)
+    recording(sentence, quality=Recording.GOOD, is_best=True, wrong_speaker=True)
+    recording(sentence, quality=Recording.OK, is_user_submitted=True)
+
+    no_origin = phrase("awas", origin=None)
+    recording(no_origin, quality=Recording.UNKNOWN)
+
+    long_sentence = phrase(
+        "ê-nipat kiya ekwa", status=Phrase.AUTO, analysis="ê-nipat+V+AI"
+    )
+    touch(long_sentence)
+    recording(long_sentence, touched=True, quality=Recording.GOOD)
+    recording(long_sentence, touched=True, quality=Recording.GOOD, is_best=True)
+
+    phrase("mîcisow", validated=True, status=Phrase.VALIDATED, analysis="mîcisow")
+
+    elsewhere = phrase("awas", language=other_language)
+    recording(elsewhere, touched=True, quality=Recording.GOOD)
@@ -0,0 +1,58 @@
+"""
+Tests for resolving a user's roles for a language.
+"""
+
+import pytest  # type: ignore
+from django.contrib.auth.models import AnonymousUser, Group, User
+from model_bakery import baker  # type: ignore
+
+from validation.views import UserRoles
+
+
+@pytest.mark.django_db
+def test_roles_are_resolved_with_one_query(django_assert_num_queries):
+    user = make_user("Linguist", "maskwacis")
+
+    with django_assert_num_queries(1):
+        roles = UserRoles(user, "maskwacis")
+        other_roles = UserRoles(user, "tsuutina")
+
+    assert roles.is_linguist and roles.is_expert
+    assert not roles.is_manager
+    assert not other_roles.is_linguist and not other_roles.is_expert
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ("groups", "linguist", "expert", "manager"),
+    [
+        (["Linguist", "maskwacis"], True, True, False),
+        (["Expert", "maskwacis"], False, True, False),
+        (["Manager", "maskwacis"], False, False, True),
+        (["Linguist", "Manager"], False, False, False),
+        ([], False, False, False),
+    ],
+)
+def test_roles_for_language(groups, linguist, expert, manager):
+    roles = UserRoles(make_user(*groups), "maskwacis")
+
+    assert roles.is_linguist == linguist
+    assert roles.is_expert == expert
+    assert roles.is_manager == manager
+
+
+@pytest.mark.django_db
+def test_anonymous_user_has_no_roles(django_assert_num_queries):
+    with django_assert_num_queries(0):
+        roles = UserRoles(AnonymousUser(), "maskwacis")
+
+    assert not (roles.is_linguist or roles.is_expert or roles.is_manager)
+    assert not UserRoles().is_manager
+
+
+def make_user(*group_names):
+    user = baker.make(User, is_superuser=False)
+    for name in group_names:
+        group, _ = Group.objects.get_or_create(name=name)
+        group.user_set.add(user)
+    return User.objects.get(id=user.id)
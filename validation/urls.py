@@ -46,6 +46,11 @@ urlpatterns = [
     path(
         "<str:language>/advanced_search/", views.advanced_search, name="advanced_search"
     ),
+    path(
+        "<str:language>/advanced_search/facets",
+        views.advanced_search_facets,
+        name="advanced_search_facets",
+    ),
     path(
         "<str:language>/advanced_search_results/",
         views.advanced_search_results,
@@ -113,6 +118,11 @@ urlpatterns = [
         views.save_wrong_word,
         name="save_wrong_word",
     ),
+    path(
+        "<str:language>/api/autocomplete",
+        views.autocomplete_transcriptions,
+        name="autocomplete",
+    ),
     path(
         "<str:language>/api/close_issue/<str:issue_id>",
         views.close_issue,
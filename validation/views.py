@@ -3,7 +3,6 @@
 
 import datetime
 import json
-import operator
 
 # Copyright (C) 2018 Eddie Antonio Santos <easantos@ualberta.ca>,
 #               2024 Felipe Banados Schwerter <banadoss@ualberta.ca>
@@ -23,14 +22,16 @@ import operator
 import subprocess
 import time
 import re
-from functools import reduce
 from hashlib import sha256
 from http import HTTPStatus
 from pathlib import Path
 from collections import Counter
-from django.db import transaction
+from collections.abc import Mapping
+from functools import partial
+from django.db import connection, transaction
 
 import mutagen as mutagen
+from simple_history.utils import bulk_create_with_history
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate
@@ -42,7 +43,18 @@ from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView, LogoutView
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.core.paginator import Paginator
-from django.db.models import Q, QuerySet, Count, Case, When, IntegerField, F
+from django.db.models import (
+    F,
+    Q,
+    QuerySet,
+    Count,
+    Exists,
+    OuterRef,
+    Prefetch,
+    Value,
+    Window,
+)
+from django.db.models.functions import RowNumber
 from django.http import (
     HttpResponse,
     HttpResponseBadRequest,
@@ -54,6 +66,7 @@ from django.http import (
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
 from django.utils.http import urlencode
+from django.utils.timesince import timesince
 from django.views.decorators.http import require_http_methods
 from django.core.exceptions import PermissionDenied
 
@@ -71,8 +84,7 @@ from .models import (
     SemanticClass,
     SemanticClassAnnotation,
     HistoricalSemanticClassAnnotation,
-    HistoricalRecording,
-    HistoricalPhrase,
+    StatisticsSnapshot,
 )
 from .forms import (
     EditSegment,
@@ -83,29 +95,47 @@ from .forms import (
     RecordNewPhrase,
 )
 from .helpers import (
-    get_distance_with_translations,
+    get_precomputed_suggestions,
 )
 from .crk_sort import custom_sort
+from .history import bulk_delete_with_history
+from . import api_cache
+from .advanced_search import cached_facet_counts, compile_search
+from .api_cache import cached_json_response
+from .search import (
+    close_transcriptions,
+    order_by_relevance,
+    phrase_search_terms,
+    text_matches,
+)
+from .statistics import get_statistics_snapshot
 
 
 class UserRoles:
     def __init__(self, user=None, lang=None):
-        self.is_linguist = (
-            user
-            and user.groups.filter(name="Linguist").exists()
-            and user.groups.filter(name=lang).exists()
-        )
-        self.is_expert = (
-            user
-            and user.groups.filter(name__in=["Linguist", "Expert"]).exists()
-            and user.groups.filter(name=lang).exists()
-        )
+        groups = get_group_names(user) if user else frozenset()
+        in_language = lang in groups
+
+        self.is_linguist = "Linguist" in groups and in_language
+        self.is_expert = not groups.isdisjoint({"Linguist", "Expert"}) and in_language
         self.is_admin = user and user.is_superuser
-        self.is_manager = (
-            user
-            and user.groups.filter(name="Manager").exists()
-            and user.groups.filter(name=lang).exists()
-        ) or self.is_admin
+        self.is_manager = ("Manager" in groups and in_language) or self.is_admin
+
+
+def get_group_names(user):
+    """
+    Returns the names of all the groups the user belongs to.
+    The names are fetched with a single query and kept on the user object,
+    so constructing UserRoles several times in one request is free.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    try:
+        return user._recval_group_names
+    except AttributeError:
+        user._recval_group_names = frozenset(user.groups.values_list("name", flat=True))
+        return user._recval_group_names
 
 
 def home(request):
@@ -238,7 +268,7 @@ def entries(request, language):
         else:
             all_phrases = all_phrases.filter(status=mode)
 
-        all_phrases = all_phrases.prefetch_related("recording_set__speaker")
+        all_phrases = all_phrases.prefetch_related(segment_card_recordings())
 
         sessions = (
             RecordingSession.objects.order_by("id").values("id", "date").distinct()
@@ -313,11 +343,13 @@ def entries(request, language):
         semantic_display = ""
 
     all_semantic_classes = semantic_classes_collect(
-        SemanticClass.objects.distinct().annotate(
+        SemanticClass.objects.distinct()
+        .annotate(
             phrases=Count(
                 "phrase", distinct=True, filter=Q(phrase__language=language_object)
             ),
         )
+        .prefetch_related("hyponyms")
     )
     all_semantic_classes.sort(key=lambda x: x["name"])
 
@@ -360,18 +392,24 @@ def search_phrases(request, language):
     language_object = get_language_object(language)
 
     query = request.GET.get("query")
-    all_matches = (
-        Phrase.objects.filter(
-            Q(transcription__contains=query)
-            | Q(fuzzy_transcription__contains=to_indexable_form(query))
-            | Q(translation__contains=query)
-        )
-        .exclude(status=Phrase.USER)
+    terms = phrase_search_terms(query)
+    searchable = (
+        Phrase.objects.exclude(status=Phrase.USER)
         .filter(language=language_object)
-        .prefetch_related("recording_set__speaker")
+        .prefetch_related(segment_card_recordings())
     )
-    all_matches = list(all_matches)
-    all_matches.sort(key=lambda phrase: phrase.transcription)
+    all_matches = order_by_relevance(searchable.filter(text_matches(terms)), terms)
+
+    close_matches = False
+    if query and not all_matches.exists():
+        # Nothing is spelled like the query; show near misses instead.
+        distances = close_transcriptions(query, language_object)
+        if distances:
+            close_matches = True
+            all_matches = sorted(
+                searchable.filter(id__in=distances),
+                key=lambda phrase: distances[phrase.id],
+            )
 
     query_term = QueryDict("", mutable=True)
     query_term.update({"query": query})
@@ -395,6 +433,7 @@ def search_phrases(request, language):
         recordings=recordings,
         speakers=speakers,
         search_term=query,
+        close_matches=close_matches,
         query=query_term,
         encode_query_with_page=encode_query_with_page,
         roles=roles,
@@ -410,13 +449,16 @@ def advanced_search(request, language):
     The search results for pages.
     """
     language_object = get_language_object(language)
-    speakers = language_object.speaker_set.all()
-    speakers = [speaker.code for speaker in speakers if speaker.recording_set.exists()]
-    semantic_classes = (
-        SemanticClass.objects.filter(phrase__language=language_object)
-        .distinct()
-        .order_by("classification")
-    )
+    speakers = language_object.speaker_set.filter(
+        Exists(Recording.objects.filter(speaker=OuterRef("pk")))
+    ).values_list("code", flat=True)
+    semantic_classes = SemanticClass.objects.filter(
+        Exists(
+            SemanticClassAnnotation.objects.filter(
+                semantic_class=OuterRef("pk"), phrase__language=language_object
+            )
+        )
+    ).order_by("classification")
 
     context = dict(
         speakers=speakers,
@@ -429,6 +471,15 @@ def advanced_search(request, language):
     return render(request, "validation/advanced_search.html", context)
 
 
+def advanced_search_facets(request, language):
+    """
+    How many phrases each choice of the advanced search form would find, given
+    the rest of the form (see validation.advanced_search.count_facets).
+    """
+    language_object = get_language_object(language)
+    return JsonResponse(cached_facet_counts(request.GET, language_object))
+
+
 def advanced_search_results(request, language):
     """
     Search results for advanced search
@@ -436,154 +487,44 @@ def advanced_search_results(request, language):
     queries to return all the appropriate entries
     The steps are:
     target language phrases UNION english phrases UNION analysis
-    INTERSECT status
-    INTERSECT speaker
+    INTERSECT status, kind, and semantic class
+    INTERSECT speaker and quality
+    (see validation.advanced_search)
     """
     roles = UserRoles(request.user, language)
-
-    transcription = request.GET.get("transcription")
-    if transcription:
-        transcription = transcription.strip()
-    translation = request.GET.get("translation")
-    if translation:
-        translation = translation.strip()
-    exact = request.GET.get("exact")
-    analysis = request.GET.get("analysis")
-    lemma = request.GET.get("lemma")
-    if lemma:
-        lemma = lemma.strip()
-    kind = request.GET.get("kind")
-    status = request.GET.get("status")
-    status_choice = status
-    semantic = request.GET.get("semantic_class")
-    semantic_class_source = request.GET.get("semantic-class-source", "all")
-    speakers = request.GET.getlist("speaker-options")
-    quality = request.GET.getlist("quality")
     language_object = get_language_object(language)
 
-    if status and status != "all":
-        status_choices = {
-            "new": Phrase.NEW,
-            "linked": Phrase.LINKED,
-            "auto-validated": Phrase.AUTO,
-            "user-submitted": Phrase.USER,
-            "needs-review": Phrase.REVIEW,
-            "not-checked": "not-checked",
-            "grey-card": "grey-card",
-        }
-        status = status_choices[status]
-
-    filter_query = []
-    if transcription:
-        if exact == "exact":
-            filter_query.append(Q(transcription=transcription))
-        else:
-            filter_query.append(
-                Q(fuzzy_transcription__contains=to_indexable_form(transcription))
-            )
-            filter_query.append(Q(transcription__contains=transcription))
-    if translation:
-        filter_query.append(Q(translation__contains=translation))
-    if analysis:
-        filter_query.append(Q(analysis__contains=analysis))
-    if lemma:
-        filter_query.append(Q(analysis__contains=lemma))
-    if status:
-        if status == "not-checked":
-            filter_query.append(
-                Q(status=Phrase.NEW) | Q(status=Phrase.AUTO) | Q(status=Phrase.USER)
-            )
-        elif status == "grey-card":
-            filter_query.append(~Q(validated=True) & ~Q(status=Phrase.REVIEW))
-        elif status != "all":
-            filter_query.append(Q(status=status))
-    if semantic:
-        semantic_object = SemanticClass.objects.get(classification=semantic)
-        filter_query.append(Q(semantic_classes=semantic_object))
-    if semantic_class_source and semantic_class_source != "all":
-        annotations = SemanticClassAnnotation.objects.filter(
-            source=semantic_class_source
-        ).values("phrase")
-        filter_query.append(Q(id__in=annotations))
-
-    if kind and kind != "all":
-        filter_kind = Phrase.WORD if kind == "word" else Phrase.SENTENCE
-        filter_query.append(Q(kind=filter_kind))
-
-    if filter_query:
-        phrase_matches = (
-            Phrase.objects.filter(language=language_object)
-            .filter(reduce(operator.or_, filter_query))
-            .prefetch_related("recording_set__speaker")
-        )
-    else:
-        phrase_matches = Phrase.objects.filter(
-            language=language_object
-        ).prefetch_related("recording_set__speaker")
-
-    recordings = {}
-    all_matches = []
-
-    # Performing the filtering directly on the database (by using django querysets)
-    # is much faster than doing it in Python.
-
-    recordings_include_query = None
-    phrase_include_query = None
-    if speakers and "all" not in speakers:
-        recordings_include_query = Q(speaker__in=speakers)
-        phrase_include_query = Q(recording__speaker__in=speakers)
-    if quality and "all" not in quality:
-        quality_recording_filter = Q(quality__in=quality)
-        quality_phrase_filter = Q(recording__quality__in=quality)
-        recordings_include_query = (
-            quality_recording_filter
-            if not recordings_include_query
-            else recordings_include_query & quality_recording_filter
-        )
-        phrase_include_query = (
-            quality_phrase_filter
-            if not phrase_include_query
-            else phrase_include_query & quality_phrase_filter
-        )
-
-    all_matches = (
-        phrase_matches
-        if not phrase_include_query
-        else phrase_matches.filter(phrase_include_query)
+    plan = compile_search(request.GET)
+    all_matches = plan.phrases(language_object).prefetch_related(
+        segment_card_recordings(only=plan.recording_filter)
     )
-    all_matches = all_matches.order_by("transcription").distinct()
-    for phrase in all_matches:
-        recordings[phrase] = (
-            phrase.recording_set.all()
-            if not recordings_include_query
-            else phrase.recording_set.filter(recordings_include_query)
-        )
-
-    _, forms = prep_phrase_data(request, all_matches, language_object.name)
 
+    # Keep the search parameters, so that other pages have the same results.
     query = QueryDict("", mutable=True)
-    query.update(
-        {
-            "transcription": transcription,
-            "translation": translation,
-            "analysis": analysis,
-            "status": status_choice,
-            "kind": kind,
-            "exact": exact,
-            "lemma": lemma,
-            "semantic_class": semantic,
-            "semantic-class-source": semantic_class_source,
-        }
-    )
-    for speaker in speakers:
+    for parameter in (
+        "transcription",
+        "translation",
+        "analysis",
+        "status",
+        "kind",
+        "exact",
+        "lemma",
+        "semantic_class",
+    ):
+        query[parameter] = request.GET.get(parameter)
+    query["semantic-class-source"] = request.GET.get("semantic-class-source", "all")
+    for speaker in request.GET.getlist("speaker-options"):
         query.appendlist("speaker-options", speaker)
 
-    for q in quality:
+    for q in request.GET.getlist("quality"):
         query.appendlist("quality", q)
 
+    # Only the phrases (and recordings) on the current page are ever fetched.
     paginator = Paginator(all_matches, 5)
     page_no = request.GET.get("page", 1)
     phrases = paginator.get_page(page_no)
+    recordings, forms = prep_phrase_data(request, phrases, language_object.name)
+
     context = dict(
         phrases=phrases,
         recordings=recordings,
@@ -642,6 +583,9 @@ def search_recordings(request, query):
     """
     Searches for recordings whose phrase's transcription matches the query.
     The response is JSON that can be used by external apps (i.e., itwêwina).
+
+    With ?fuzzy=true, a word form that matches nothing falls back to the
+    phrases spelled closest to it.
     """
 
     # Maximum amount of comma-separated query terms.
@@ -653,18 +597,42 @@ def search_recordings(request, query):
         response.status_code = 414
         return add_cors_headers(response)
 
-    word_forms = frozenset(query.split(","))
+    # Word forms are searched for by their fuzzy transcription, so forms that
+    # only differ in diacritics, case or spacing share a search (and a cache
+    # entry).
+    word_forms = {to_indexable_form(form): form for form in query.split(",")}
+    fuzzy = request.GET.get("fuzzy", default=None) == "true"
+
+    response = cached_json_response(
+        request,
+        language=api_cache.ALL_LANGUAGES,
+        key=["search_recordings", sorted(word_forms), fuzzy],
+        make_response=lambda: find_recordings(request, word_forms, fuzzy),
+    )
+    return add_cors_headers(response)
+
 
-    recordings = []
-    for form in word_forms:
-        # Assume the query is an SRO transcription; prepare it for a fuzzy match.
-        fuzzy_transcription = to_indexable_form(form)
+def find_recordings(request, word_forms, fuzzy):
+    """
+    Builds the (uncached) response of search_recordings(). word_forms maps
+    the fuzzy transcription of each word form to the form.
+    """
+    matches = []
+    for fuzzy_transcription, form in sorted(word_forms.items()):
         all_matches = Recording.objects.filter(
             phrase__fuzzy_transcription=fuzzy_transcription,
         )
-        results = exclude_known_bad_recordings(all_matches)
+        results = list(api_recordings(all_matches))
+        if fuzzy and not results:
+            distances = close_transcriptions(form)
+            results = sorted(
+                api_recordings(Recording.objects.filter(phrase_id__in=distances)),
+                key=lambda recording: distances[recording.phrase_id],
+            )
+        matches.extend(results)
 
-        recordings.extend(recording.as_json(request) for recording in results)
+    speakers = Recording.speaker_api_details(matches)
+    recordings = [recording.as_json(request, speakers) for recording in matches]
 
     response = JsonResponse(recordings, safe=False)
 
@@ -672,7 +640,7 @@ def search_recordings(request, query):
         # No matches. Return an empty JSON response
         response.status_code = 404
 
-    return add_cors_headers(response)
+    return response
 
 
 def regex_from_equivalences(term, equivalences):
@@ -682,21 +650,78 @@ def regex_from_equivalences(term, equivalences):
     return str
 
 
-def extract_recording_sample(sample):
-    if sample.count() <= 10:
-        return sample
-    by_speaker = [
-        list(sample.filter(speaker=s["speaker"]))
-        for s in sample.values("speaker").distinct()
-    ]
-    answer = set(sample.filter(is_best=True))
-    while len(answer) < 10:
-        for speaker_list in by_speaker:
-            try:
-                answer.add(speaker_list.pop(0))
-            except IndexError:
-                pass
-    return list(answer)
+# How many recordings of each word form the bulk search returns, unless it is
+# asked for exact matches.
+RECORDING_SAMPLE_SIZE = 10
+
+# SQLite allows at most 500 SELECTs in one compound (UNION) statement.
+MAX_TERMS_PER_SAMPLE_QUERY = 100
+
+
+def sample_recordings(recordings_by_term: dict, size=RECORDING_SAMPLE_SIZE) -> dict:
+    """
+    Picks up to size recordings for each term from its QuerySet of recordings:
+    the best recordings first, then the speakers' recordings in turns, so that
+    as many speakers as possible are heard.
+
+    Every term is sampled in the same query: each speaker's recordings are
+    ranked by a window function, and only the top ranks are fetched.
+    """
+    terms = list(recordings_by_term)
+    candidates: dict = {term: [] for term in terms}
+
+    if connection.features.supports_over_clause:
+        for start in range(0, len(terms), MAX_TERMS_PER_SAMPLE_QUERY):
+            batch = terms[start : start + MAX_TERMS_PER_SAMPLE_QUERY]
+            # A speaker's later recordings can never make the sample: their
+            # first ones would all come before them.
+            parts = [
+                recordings_by_term[term]
+                .annotate(
+                    term_index=Value(index),
+                    speaker_rank=Window(
+                        RowNumber(),
+                        partition_by=F("speaker"),
+                        order_by=[F("is_best").desc(), F("pk").asc()],
+                    ),
+                )
+                .filter(speaker_rank__lte=size)
+                .order_by()
+                for index, term in enumerate(batch, start)
+            ]
+            for recording in parts[0].union(*parts[1:], all=True):
+                candidates[terms[recording.term_index]].append(recording)
+    else:
+        for term in terms:
+            candidates[term] = _rank_by_speaker(recordings_by_term[term])
+
+    return {
+        term: sorted(recordings, key=_sample_order)[:size]
+        for term, recordings in candidates.items()
+    }
+
+
+def _rank_by_speaker(recordings) -> list:
+    """
+    Ranks each speaker's recordings like sample_recordings() does in SQL.
+    """
+    ranks: Counter = Counter()
+    ranked = sorted(
+        recordings, key=lambda recording: (not recording.is_best, recording.pk)
+    )
+    for recording in ranked:
+        ranks[recording.speaker_id] += 1
+        recording.speaker_rank = ranks[recording.speaker_id]
+    return ranked
+
+
+def _sample_order(recording):
+    return (
+        not recording.is_best,
+        recording.speaker_rank,
+        recording.speaker_id,
+        recording.pk,
+    )
 
 
 def bulk_search_recordings(request: HttpRequest, language: str):
@@ -710,9 +735,35 @@ def bulk_search_recordings(request: HttpRequest, language: str):
     """
 
     query_terms = request.GET.getlist("q")
-    matched_recordings = []
-    not_found = []
     exact = request.GET.get("exact", default=None) == "true"
+
+    if not LanguageVariant.objects.filter(code=language).exists():
+        not_found = [term for term in query_terms]
+        response = {"matched_recordings": [], "not_found": not_found}
+        json_response = JsonResponse(response)
+        return add_cors_headers(json_response)
+
+    language_object = get_language_object(language)
+    json_response = cached_json_response(
+        request,
+        language=language_object.id,
+        # The terms as given, in order: exact searches match them as typed,
+        # and the response echoes them (in not_found, and as the wordform of
+        # each recording).
+        key=["bulk_search_recordings", query_terms, exact],
+        make_response=lambda: bulk_find_recordings(
+            request, language_object, query_terms, exact
+        ),
+    )
+    return add_cors_headers(json_response)
+
+
+def bulk_find_recordings(request, language_object, query_terms, exact):
+    """
+    Builds the (uncached) response of bulk_search_recordings().
+    """
+    matches = []
+    not_found = []
     relaxed_equivalences = [
         r"(y|ý)",
         r"(á|à|â|ā)",
@@ -721,14 +772,8 @@ def bulk_search_recordings(request: HttpRequest, language: str):
         r"(e|é|è|ê|ē)",
     ]
 
-    if not LanguageVariant.objects.filter(code=language).exists():
-        not_found = [term for term in query_terms]
-        response = {"matched_recordings": matched_recordings, "not_found": not_found}
-        json_response = JsonResponse(response)
-        return add_cors_headers(json_response)
-
+    candidates = {}
     for term in query_terms:
-        language_object = get_language_object(language)
         if exact:
             all_matches = Recording.objects.filter(
                 phrase__transcription=term, phrase__language=language_object
@@ -740,20 +785,31 @@ def bulk_search_recordings(request: HttpRequest, language: str):
                 ),
                 phrase__language=language_object,
             )
-        results = exclude_known_bad_recordings(all_matches)
-        if not exact:
-            # We will reuse the exact keyword for a full query.
-            # The advantage of this is that, because morphodict queries do not ask for an exact query,
-            # It will automatically limit requests coming from morphodict.
-            results = extract_recording_sample(results)
+        candidates[term] = api_recordings(all_matches)
+
+    if exact:
+        results_by_term = {
+            term: list(recordings) for term, recordings in candidates.items()
+        }
+    else:
+        # We will reuse the exact keyword for a full query.
+        # The advantage of this is that, because morphodict queries do not ask for an exact query,
+        # It will automatically limit requests coming from morphodict.
+        results_by_term = sample_recordings(candidates)
+
+    for term in query_terms:
+        results = results_by_term[term]
         if results:
-            matched_recordings.extend(
-                annotate_relaxed_wordform(recording.as_json(request), term)
-                for recording in results
-            )
+            matches.extend((term, recording) for recording in results)
         else:
             not_found.append(term)
 
+    speakers = Recording.speaker_api_details(recording for _, recording in matches)
+    matched_recordings = [
+        annotate_relaxed_wordform(recording.as_json(request, speakers), term)
+        for term, recording in matches
+    ]
+
     if matched_recordings:
         matched_recordings.sort(
             key=lambda recording: not recording.get("is_best")
@@ -761,9 +817,7 @@ def bulk_search_recordings(request: HttpRequest, language: str):
 
     response = {"matched_recordings": matched_recordings, "not_found": not_found}
 
-    json_response = JsonResponse(response)
-
-    return add_cors_headers(json_response)
+    return JsonResponse(response)
 
 
 def add_cors_headers(response):
@@ -781,52 +835,35 @@ def segment_content_view(request, language, segment_id):
     Returns the selected phrase and info provided by the helper functions
     """
     language_object = get_language_object(language)
+    phrase = Phrase.objects.get(id=segment_id, language=language_object)
     if request.method == "POST":
         form = EditSegment(request.POST)
-        og_phrase = Phrase.objects.get(id=segment_id, language=language_object)
-        phrase_id = og_phrase.id
         if form.is_valid():
             transcription = (
-                form.cleaned_data["source_language"].strip() or og_phrase.transcription
+                form.cleaned_data["source_language"].strip() or phrase.transcription
             )
-            translation = (
-                form.cleaned_data["translation"].strip() or og_phrase.translation
-            )
-            analysis = form.cleaned_data["analysis"].strip() or og_phrase.analysis
-            comment = form.cleaned_data["comment"].strip() or og_phrase.comment
+            translation = form.cleaned_data["translation"].strip() or phrase.translation
+            analysis = form.cleaned_data["analysis"].strip() or phrase.analysis
+            comment = form.cleaned_data["comment"].strip() or phrase.comment
             rapidwords = form.cleaned_data["rapidwords"]
-            p = Phrase.objects.get(id=phrase_id, language=language_object)
-            previous_classes = SemanticClassAnnotation.objects.filter(
-                phrase=p, semantic_class__collection=SemanticClass.RW
-            )
-            for candidate in previous_classes:
-                if candidate.semantic_class not in rapidwords:
-                    candidate.delete()
-            previous_classes = p.semantic_classes.all()
-            for candidate in rapidwords:
-                if candidate not in previous_classes:
-                    SemanticClassAnnotation.objects.create(
-                        phrase=p,
-                        semantic_class=candidate,
-                        source=SemanticClassAnnotation.MANUAL,
-                    )
-            p.transcription = transcription
-            p.translation = translation
-            p.analysis = analysis
-            p.comment = comment
-            p.validated = True
-            p.modifier = str(request.user)
-            p.date = datetime.datetime.now()
-            p.save()
+            with transaction.atomic():
+                update_rapidwords_annotations(phrase, rapidwords)
+                phrase.transcription = transcription
+                phrase.translation = translation
+                phrase.analysis = analysis
+                phrase.comment = comment
+                phrase.validated = True
+                phrase.modifier = str(request.user)
+                phrase.date = datetime.datetime.now()
+                phrase.save()
 
-    phrase = Phrase.objects.get(id=segment_id, language=language_object)
     _transcription = phrase.field_transcription or phrase.transcription
     suggestions = {}
 
     # Only try to collect suggestions if the right cookie is set.
     # Otherwise continue.
     if request.COOKIES.get("suggestions", "on") != "off":
-        suggestions = get_distance_with_translations(_transcription)
+        suggestions = get_precomputed_suggestions(_transcription)
 
     segment_name = phrase.transcription
 
@@ -863,6 +900,43 @@ def segment_content_view(request, language, segment_id):
     return render(request, "validation/segment_details.html", context)
 
 
+def update_rapidwords_annotations(phrase, rapidwords):
+    """
+    Makes the selected RapidWords classes the phrase's RapidWords annotations:
+    removes the others, and manually annotates the phrase with the new ones
+    (that it is not already annotated with, from any collection).
+    """
+    selected = {semantic_class.id: semantic_class for semantic_class in rapidwords}
+    annotations = list(
+        SemanticClassAnnotation.objects.filter(phrase=phrase).select_related(
+            "semantic_class"
+        )
+    )
+    removed = [
+        annotation
+        for annotation in annotations
+        if annotation.semantic_class.collection == SemanticClass.RW
+        and annotation.semantic_class_id not in selected
+    ]
+    annotated = {annotation.semantic_class_id for annotation in annotations} - {
+        annotation.semantic_class_id for annotation in removed
+    }
+
+    bulk_delete_with_history(removed, SemanticClassAnnotation)
+    bulk_create_with_history(
+        [
+            SemanticClassAnnotation(
+                phrase=phrase,
+                semantic_class=semantic_class,
+                source=SemanticClassAnnotation.MANUAL,
+            )
+            for id, semantic_class in selected.items()
+            if id not in annotated
+        ],
+        SemanticClassAnnotation,
+    )
+
+
 def register(request):
     """
     Serves the register page and creates a new user on success
@@ -941,7 +1015,7 @@ def view_issue_detail(request, language, issue_id):
     issue = Issue.objects.get(id=issue_id, language=language)
 
     form = None
-    autocomplete = None
+    autocomplete_url = None
     if issue.recording:
         if request.method == "POST":
             form = EditIssueWithRecording(request.POST)
@@ -960,9 +1034,7 @@ def view_issue_detail(request, language, issue_id):
             form = EditIssueWithRecording(
                 initial={"phrase": phrase, "speaker": speaker}
             )
-            autocomplete = list(
-                Phrase.objects.values_list("transcription", flat=True).distinct()
-            )
+            autocomplete_url = url("validation:autocomplete", language.code)
 
             # Save previous URL to make the "back" button work properly
             request.session["issue_origin_url"] = request.META.get(
@@ -1005,12 +1077,44 @@ def view_issue_detail(request, language, issue_id):
         auth=request.user.is_authenticated,
         roles=UserRoles(request.user, language.code),
         language=language,
-        autocomplete=autocomplete,
+        autocomplete_url=autocomplete_url,
         other_issues=other_issues.filter(status="open"),
     )
     return render(request, "validation/view_issue_detail.html", context)
 
 
+# Autocompletion only kicks in once this many characters have been typed.
+MIN_AUTOCOMPLETE_TERM_LENGTH = 3
+MAX_AUTOCOMPLETE_RESULTS = 20
+# Every string that starts with a prefix sorts before prefix + this character.
+LAST_CODE_POINT = "\U0010ffff"
+
+
+def autocomplete_transcriptions(request, language):
+    """
+    Returns (as JSON) the transcriptions in the language that start with ?term=
+    This is the source for jQuery UI's autocomplete widget.
+    """
+    language_object = get_language_object(language)
+    term = request.GET.get("term", "").strip()
+    if len(term) < MIN_AUTOCOMPLETE_TERM_LENGTH:
+        return JsonResponse([], safe=False)
+
+    # A range (rather than __startswith, which becomes a LIKE in SQLite)
+    # lets the database use the (language, transcription) index.
+    matches = (
+        Phrase.objects.filter(
+            language=language_object,
+            transcription__gte=term,
+            transcription__lt=term + LAST_CODE_POINT,
+        )
+        .order_by("transcription")
+        .values_list("transcription", flat=True)
+        .distinct()
+    )
+    return JsonResponse(list(matches[:MAX_AUTOCOMPLETE_RESULTS]), safe=False)
+
+
 def close_issue(request, language, issue_id):
     language = get_language_object(language)
     issue = Issue.objects.get(id=issue_id, language=language)
@@ -1286,14 +1390,10 @@ def merge_phrases_search(request, language):
     candidates = False
     query = request.GET.get("merge-search", "")
     if query:
-        candidates = (
-            Phrase.objects.filter(language=language)
-            .filter(
-                Q(transcription__contains=query)
-                | Q(fuzzy_transcription__contains=to_indexable_form(query))
-                | Q(translation__contains=query)
-            )
-            .order_by("transcription")
+        terms = phrase_search_terms(query)
+        candidates = order_by_relevance(
+            Phrase.objects.filter(language=language).filter(text_matches(terms)),
+            terms,
         )
 
     context = dict(
@@ -1339,8 +1439,9 @@ def merge_phrases_delete(request, language):
         merge_items = [int(id) for id in request.GET.getlist("merge-selected")]
         candidates = Phrase.objects.filter(id__in=merge_items).order_by("transcription")
         if phrases_can_auto_merge(candidates):
+            destination = candidates.first()
             handle_merge_phrases(
-                candidates.first(), Phrase.objects.filter(id__in=merge_items[1:]), True
+                destination, candidates.exclude(id=destination.id), True
             )
             return HttpResponseRedirect(url("validation:merge-search", language.code))
         context = dict(
@@ -1583,13 +1684,6 @@ def merge_strings(join_str=" | "):
     return merge_function
 
 
-def merge_many_to_many(destination, field, dataset):
-    manager = getattr(destination, field)
-    for entries in dataset:
-        for entry in entries.all():
-            manager.add(entry)
-
-
 def merge_int_with_function(function):
     def merge_function(destination, field, set):
         setattr(destination, field, function(set))
@@ -1597,51 +1691,109 @@ def merge_int_with_function(function):
     return merge_function
 
 
-def different_contents_queryset(field, dest_value):
-    if hasattr(dest_value, "all"):
-        # The field is likely a many to many field, or some other using a RelatedManager
-        return ~Q(**{(field + "__in"): dest_value.all()})
-    return ~Q(**{field: dest_value})
+# How to merge each field of the phrases, when deep merging.
+MERGED_PHRASE_FIELDS = {
+    "field_transcription": merge_strings(),
+    "transcription": merge_strings(),
+    "translation": merge_strings(),
+    "stem": merge_strings(),
+    "lexical_category": merge_strings(),
+    "osid": merge_strings(),
+    "analysis": merge_strings("\n"),
+    "comment": merge_strings(),
+    "display_order": merge_int_with_function(min),
+}
 
 
 def handle_merge_phrases(destination, sources, should_deep_merge):
+    """
+    Merges the source phrases into the destination, in one transaction: moves
+    their recordings to the destination and deletes them. When deep merging,
+    also merges their fields, old semantic classes, and semantic class
+    annotations into the destination's.
+    """
+    with transaction.atomic():
+        sources = list(
+            sources.exclude(id=destination.id).prefetch_related("semantic_class")
+        )
+        if not sources:
+            return
+
+        # Change all the phrases on the recordings for sources to the new canonical phrase
+        recordings = list(Recording.objects.filter(phrase__in=sources))
+        if recordings:
+            Recording.objects.filter(id__in=[r.id for r in recordings]).update(
+                phrase=destination
+            )
+            for recording in recordings:
+                recording.phrase = destination
+            Recording.history.bulk_history_create(recordings, update=True)
+
+        if should_deep_merge:
+            for field, merge_field in MERGED_PHRASE_FIELDS.items():
+                dest_value = getattr(destination, field)
+                if any(getattr(source, field) != dest_value for source in sources):
+                    # There is a different field!  Thus we must merge.
+                    values = dict.fromkeys(
+                        [dest_value, *(getattr(source, field) for source in sources)]
+                    )
+                    merge_field(destination, field, values)
+            destination.save()
+
+            merge_old_semantic_classes(destination, sources)
+            merge_semantic_class_annotations(destination, sources)
+
+        # What the post_save receivers of the recordings would have done:
+        StatisticsSnapshot.objects.filter(
+            language_id=destination.language_id, is_stale=False
+        ).update(is_stale=True)
+        transaction.on_commit(
+            partial(api_cache.invalidate_language, destination.language_id)
+        )
 
-    # Change all the phrases on the recordings for sources to the new canonical phrase
-    for source in sources:
-        for recording in source.recording_set.all():
-            recording.phrase = destination
-            recording.save(update_fields=["phrase"])
-
-    # Check for all fields in the set:
-    if should_deep_merge:
-        fields = {
-            "field_transcription": merge_strings(),
-            "transcription": merge_strings(),
-            "translation": merge_strings(),
-            "stem": merge_strings(),
-            "lexical_category": merge_strings(),
-            "osid": merge_strings(),
-            "analysis": merge_strings("\n"),
-            "comment": merge_strings(),
-            "display_order": merge_int_with_function(min),
-            "semantic_class": merge_many_to_many,
-        }
-        updated = []
-        for field, merge_fields in fields.items():
-            dest_value = getattr(destination, field)
-            if (
-                sources.filter(different_contents_queryset(field, dest_value)).count()
-                > 0
-            ):
-                # There is a different field!  Thus we must merge.
-                values = {getattr(entry, field) for entry in sources}
-                values.add(dest_value)
-                merge_fields(destination, field, values)
-                updated.append(field)
-        destination.save()
-
-    # Delete each of the source phrases
-    sources.delete()
+        # Delete each of the source phrases
+        Phrase.objects.filter(id__in=[source.id for source in sources]).delete()
+
+
+def merge_old_semantic_classes(destination, sources):
+    """
+    Adds the sources' (old) semantic classes to the destination's, at once.
+    """
+    current = set(destination.semantic_class.all())
+    missing = {
+        semantic_class
+        for source in sources
+        for semantic_class in source.semantic_class.all()
+        if semantic_class not in current
+    }
+    if missing:
+        destination.semantic_class.add(*missing)
+
+
+def merge_semantic_class_annotations(destination, sources):
+    """
+    Moves the sources' annotations with a semantic class the destination is not
+    annotated with to the destination (keeping their source). The rest are
+    deleted along with the sources.
+    """
+    annotated = set(
+        SemanticClassAnnotation.objects.filter(phrase=destination).values_list(
+            "semantic_class_id", flat=True
+        )
+    )
+    moved = []
+    for annotation in SemanticClassAnnotation.objects.filter(
+        phrase__in=sources
+    ).order_by("id"):
+        if annotation.semantic_class_id not in annotated:
+            annotated.add(annotation.semantic_class_id)
+            annotation.phrase = destination
+            moved.append(annotation)
+    if moved:
+        SemanticClassAnnotation.objects.filter(id__in=[a.id for a in moved]).update(
+            phrase=destination
+        )
+        SemanticClassAnnotation.history.bulk_history_create(moved, update=True)
 
 
 def handle_save_issue_with_recording(form, issue, request, language):
@@ -1722,126 +1874,84 @@ def statistics_page(request, language):
     The language statistics page
     """
     language_object = get_language_object(language)
+    snapshot = get_statistics_snapshot(language_object)
 
     context = dict(
         language=language_object,
         roles=UserRoles(request.user, language),
-        statistics=collect_statistics(language_object),
+        statistics=snapshot.statistics,
+        snapshot=snapshot,
+        snapshot_age=timesince(snapshot.computed_on),
     )
     return render(request, "validation/statistics.html", context)
 
 
-def collect_statistics(language):
-    phrases = language.phrase_set.all()
-    historical = (
-        HistoricalPhrase.objects.filter(Q(id__in=phrases) & ~Q(history_user=None))
-        .values("id")
-        .distinct()
-    )
-    transcriptions = {x["transcription"] for x in phrases.values("transcription")}
-    split = [x.split(" ") for x in transcriptions]
-    lengths = Counter([len(x) for x in split])
-    words = {word for sentence in split for word in sentence}
-    stats = {
-        "Number of entries (words/phrases)": phrases.count(),
-        "Number of distinct transcriptions": len(transcriptions),
-        "Total distinct words (including as part of sentences)": len(words),
-        "Number of entries touched by a human in speech-db": historical.count(),
-        "Number of entries with an empty linguistic analysis": phrases.filter(
-            analysis=""
-        ).count(),
-        "Number of entries with a green heading": phrases.filter(
-            validated=True
-        ).count(),
-        "Number of entries with a red heading": phrases.filter(
-            ~Q(validated=True) & Q(status=Phrase.REVIEW)
-        ).count(),
-        "Number of entries with a grey heading": phrases.filter(
-            ~Q(validated=True) & ~Q(status=Phrase.REVIEW)
-        ).count(),
-        "Number of entries with an origin different than new word": phrases.filter(
-            ~Q(origin=Phrase.NEW_WORD)
-        ).count(),
-        "Number of entries manually marked good": phrases.filter(
-            origin=Phrase.NEW_WORD, status=Phrase.LINKED
-        ).count(),
-        "Number of entries manually marked needs review": phrases.filter(
-            origin=Phrase.NEW_WORD, status=Phrase.REVIEW
-        ).count(),  # TODO Separate No/IDK
-        "Number of entries where the 'I don't know' button appears marked": phrases.filter(
-            Q(origin=Phrase.NEW_WORD) & ~Q(status="linked") & ~Q(status="needs review")
-        ).count(),
-    }
-    for key, value in lengths.most_common():
-        ending = "s" if int(key) > 1 else ""
-        stats[f"Number of transcriptions with {key} word{ending}"] = value
+def user_has_alexis_permissions(user):
+    return "stoney-alexis" in get_group_names(user)
 
-    recordings = Recording.objects.filter(phrase__in=phrases)
-    unissued_recordings = recordings.filter(
-        wrong_word=False, wrong_speaker=False, is_user_submitted=False
-    )
-    stats["Total recordings"] = recordings.count()
-    stats["Total recordings without declared issues"] = unissued_recordings.count()
-    stats["Total recordings marked good quality"] = unissued_recordings.filter(
-        quality=Recording.GOOD
-    ).count()
-    stats["Total recordings marked bad quality"] = recordings.filter(
-        quality=Recording.BAD
-    ).count()
-    stats["Total recordings marked unknown quality"] = unissued_recordings.filter(
-        quality=Recording.UNKNOWN
-    ).count()
-    stats["Total recordings marked best"] = recordings.filter(is_best=True).count()
-
-    historical = HistoricalRecording.objects.filter(
-        Q(id__in=recordings) & ~Q(history_user=None)
-    ).values("id")
-    counted = phrases.annotate(
-        total_recordings=Count("recording", distinct=True),
-        human_touched_recordings=Count(
-            Case(When(recording__in=historical, then=1), output_field=IntegerField())
-        ),
-    )
-    stats["Total recordings touched by a human"] = Recording.objects.filter(
-        id__in=historical
-    ).count()
-    stats[
-        "Total phrases where all recordings have been touched by a human in speech-db"
-    ] = counted.filter(total_recordings=F("human_touched_recordings")).count()
-    stats[
-        "Total phrases where some recordings have been touched by a human in speech-db"
-    ] = counted.filter(human_touched_recordings__gt=0).count()
-    stats[
-        "Total phrases where no recordings have been touched by a human in speech-db"
-    ] = counted.filter(human_touched_recordings=0).count()
-    return stats
 
+def segment_card_recordings(only=None):
+    """
+    Prefetches everything the _segment_card template needs from the recordings
+    of each phrase, so that rendering a page of cards takes a fixed number of
+    queries, no matter how many recordings (or issues) each phrase has.
 
-def user_has_alexis_permissions(user):
-    return user.groups.filter(name="stoney-alexis").exists()
+    Pass a Q object as only= to prefetch only the recordings that match it.
+    """
+    recordings = Recording.objects.exclude(speaker="DAR")
+    if only is not None:
+        recordings = recordings.filter(only)
+    return Prefetch(
+        "recording_set",
+        queryset=recordings.select_related("speaker").prefetch_related("issue_set"),
+    )
 
 
 def prep_phrase_data(request, phrases, lang):
     # The _segment_card needs a dictionary of recordings
-    # in order to properly display search results
-    recordings = {}
-    forms = {}
-    for phrase in phrases:
-        recordings[phrase] = [rec for rec in phrase.recordings if rec.speaker != "DAR"]
-
-        if request.method == "POST" and int(request.POST.get("phrase_id")) == phrase.id:
-            forms[phrase.id] = FlagSegment(
-                request.POST, initial={"phrase_id": phrase.id}
-            )
-        else:
-            forms[phrase.id] = FlagSegment(initial={"phrase_id": phrase.id})
-            forms[phrase.id].fields[
-                "source_language_suggestion"
-            ].label = f"{lang} suggestion"
+    # in order to properly display search results.
+    # Note: phrases should be fetched with segment_card_recordings() prefetched!
+    recordings = {phrase: list(phrase.recording_set.all()) for phrase in phrases}
+    forms = FlagSegmentForms(request, [phrase.id for phrase in phrases], lang)
 
     return recordings, forms
 
 
+class FlagSegmentForms(Mapping):
+    """
+    The FlagSegment form for each phrase card, keyed by phrase ID.
+    Forms are only constructed when a template (or a POST) actually asks for them.
+    """
+
+    def __init__(self, request, phrase_ids, lang):
+        self._request = request
+        self._phrase_ids = phrase_ids
+        self._lang = lang
+        self._forms = {}
+
+    def __getitem__(self, phrase_id):
+        if phrase_id not in self._phrase_ids:
+            raise KeyError(phrase_id)
+        if phrase_id not in self._forms:
+            self._forms[phrase_id] = self._make_form(phrase_id)
+        return self._forms[phrase_id]
+
+    def __iter__(self):
+        return iter(self._phrase_ids)
+
+    def __len__(self):
+        return len(self._phrase_ids)
+
+    def _make_form(self, phrase_id):
+        request = self._request
+        if request.method == "POST" and int(request.POST.get("phrase_id")) == phrase_id:
+            return FlagSegment(request.POST, initial={"phrase_id": phrase_id})
+
+        form = FlagSegment(initial={"phrase_id": phrase_id})
+        form.fields["source_language_suggestion"].label = f"{self._lang} suggestion"
+        return form
+
+
 def save_issue(data, user):
     phrase_id = data["phrase_id"]
     comment = data["comment"]
@@ -1884,6 +1994,13 @@ def exclude_known_bad_recordings(recordings: QuerySet):
     )
 
 
+def api_recordings(recordings: QuerySet):
+    """
+    The recordings the API may return, with what Recording.as_json() needs.
+    """
+    return exclude_known_bad_recordings(recordings).select_related("phrase", "speaker")
+
+
 def create_new_rec_id(phrase, speaker):
     # Generate a unique ID for all user-submitted recordings
     # Since these don't have a timestamp or a session,